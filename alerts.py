@@ -0,0 +1,163 @@
+"""
+Dorothy Bot - Alerts Module
+Background fan-out of security alert DMs with deduplication and digests
+"""
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+import discord
+from outbound import outbound, LOGGING
+from utils import latency_percentiles
+
+class Digest:
+    """Alert messages waiting to be sent to one recipient as a single DM"""
+    __slots__ = ("guild", "member", "messages", "created")
+
+    def __init__(self, guild: discord.Guild, member: discord.Member, messages: List[str], created: float):
+        self.guild = guild
+        self.member = member
+        self.messages = messages
+        self.created = created
+
+class AlertDispatcher:
+    """Queue of alert DMs drained by a fixed pool of workers
+
+    The first alert for a recipient is queued right away. Alerts for the
+    same recipient during the next digest_window seconds are merged into
+    one follow-up DM, and an alert identical to one the recipient already
+    got within dedup_window is dropped. Raising an alert never waits on
+    Discord.
+    """
+
+    def __init__(self, workers: int, queue_size: int, dedup_window: float, digest_window: float):
+        self.worker_count = workers
+        self.queue_size = queue_size
+        self.dedup_window = dedup_window
+        self.digest_window = digest_window
+        self.queue: Optional[asyncio.Queue] = None
+        self.stats = {"alerts": 0, "deduplicated": 0, "merged": 0, "dropped": 0, "sent": 0, "failed": 0}
+        self.send_latencies = deque(maxlen=500)  # Seconds per DM request
+        self.queue_latencies = deque(maxlen=500)  # Seconds from alert to send
+        self._workers: List[asyncio.Task] = []
+        self._windows: Dict[tuple, Digest] = {}  # (guild, member) -> alerts merged during the open window
+        self._timers: Dict[tuple, asyncio.TimerHandle] = {}  # (guild, member) -> window close timer
+        self._recent: "OrderedDict[tuple, float]" = OrderedDict()  # (member, message) -> last alerted
+
+    def start(self):
+        """Create the queue and workers (needs a running event loop)"""
+        if self.queue is not None:
+            return
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self._workers = [asyncio.get_running_loop().create_task(self._worker()) for _ in range(self.worker_count)]
+
+    def notify(self, guild: discord.Guild, recipients: Iterable[discord.Member], message: str):
+        """Queue an alert for each recipient"""
+        self.start()
+        now = time.monotonic()
+        self._prune_recent(now)
+
+        for member in recipients:
+            self.stats["alerts"] += 1
+            dedup_key = (member.id, message)
+            last = self._recent.get(dedup_key)
+            if last is not None and now - last < self.dedup_window:
+                self.stats["deduplicated"] += 1
+                continue
+            self._recent[dedup_key] = now
+            self._recent.move_to_end(dedup_key)
+
+            key = (guild.id, member.id)
+            window = self._windows.get(key)
+            if window is not None:
+                # Burst: fold into the digest sent when the window closes
+                if window.messages:
+                    self.stats["merged"] += 1
+                window.messages.append(message)
+                continue
+
+            self._enqueue(Digest(guild, member, [message], now))
+            self._windows[key] = Digest(guild, member, [], now)
+            self._timers[key] = asyncio.get_running_loop().call_later(self.digest_window, self._close_window, key)
+
+    def _close_window(self, key: tuple):
+        self._timers.pop(key, None)
+        window = self._windows.pop(key, None)
+        if window is not None and window.messages:
+            self._enqueue(window)
+
+    def _enqueue(self, digest: Digest):
+        if self.queue is None:
+            return  # Closed
+        try:
+            self.queue.put_nowait(digest)
+        except asyncio.QueueFull:
+            self.stats["dropped"] += len(digest.messages)
+
+    def _prune_recent(self, now: float):
+        """Forget dedup keys older than the dedup window (oldest first)"""
+        cutoff = now - self.dedup_window
+        while self._recent:
+            key, seen = next(iter(self._recent.items()))
+            if seen >= cutoff:
+                break
+            del self._recent[key]
+
+    async def _worker(self):
+        while True:
+            digest = await self.queue.get()
+            try:
+                await self._send(digest)
+            finally:
+                self.queue.task_done()
+
+    async def _send(self, digest: Digest):
+        messages = digest.messages
+        if len(messages) == 1:
+            title, description = "🚨 Security Alert", messages[0]
+        else:
+            title = f"🚨 Security Alerts ({len(messages)})"
+            description = "\n\n".join(messages)
+            if len(description) > 4000:
+                description = description[:4000] + "\n…"
+        embed = discord.Embed(
+            title=title,
+            description=description,
+            color=discord.Color.red(),
+            timestamp=datetime.now()
+        )
+        embed.set_footer(text=f"Server: {digest.guild.name}")
+
+        started = time.monotonic()
+        self.queue_latencies.append(started - digest.created)
+        try:
+            await outbound.run(LOGGING, f"dm:{digest.member.id}", lambda: digest.member.send(embed=embed))
+            self.stats["sent"] += 1
+        except Exception:
+            self.stats["failed"] += 1  # DMs closed, or blocked the bot
+        self.send_latencies.append(time.monotonic() - started)
+
+    async def close(self):
+        """Stop the workers (alerts still queued or waiting for a digest are discarded)"""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        self._windows.clear()
+        for task in self._workers:
+            task.cancel()
+        if self._workers:
+            await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self.queue = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get alert counters, queue depth and latencies"""
+        return {
+            **self.stats,
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "open_digests": len(self._windows),
+            "send_latency_ms": latency_percentiles(self.send_latencies),
+            "queue_latency_ms": latency_percentiles(self.queue_latencies)
+        }
@@ -0,0 +1,100 @@
+"""
+Dorothy Bot - Audit Log Module
+In-memory index of recent audit log entries pushed by the gateway
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+class AuditLogIndex:
+    """Recent audit log entries per guild, keyed by (action, target id)
+
+    Entries arrive through on_audit_log_entry_create, usually within a moment
+    of the matching ban/kick/delete event but in either order, so resolve()
+    waits briefly for an entry that has not been pushed yet.
+    """
+
+    def __init__(self, ttl: float, max_per_guild: int):
+        self.ttl = ttl
+        self.max_per_guild = max_per_guild
+        self.stats = {"recorded": 0, "hits": 0, "waits": 0, "timeouts": 0, "evictions": 0}
+        self._guilds: Dict[int, "OrderedDict[tuple, tuple]"] = {}  # guild -> key -> (recorded_at, entry)
+        self._waiters: Dict[tuple, List[asyncio.Future]] = {}  # (guild, action, target) -> futures
+
+    def record(self, entry: Any):
+        """Index an entry from on_audit_log_entry_create and wake anyone waiting for it"""
+        target_id = getattr(entry.target, "id", None)
+        if target_id is None:
+            return
+        guild_id = entry.guild.id
+        key = (entry.action, target_id)
+        now = time.monotonic()
+
+        entries = self._guilds.setdefault(guild_id, OrderedDict())
+        entries[key] = (now, entry)
+        entries.move_to_end(key)
+        self.stats["recorded"] += 1
+        self._evict(entries, now)
+
+        for future in self._waiters.pop((guild_id, *key), ()):
+            if not future.done():
+                future.set_result(entry)
+
+    def _evict(self, entries: "OrderedDict[tuple, tuple]", now: float):
+        """Drop expired entries and the oldest ones over the per-guild limit"""
+        cutoff = now - self.ttl
+        while entries:
+            recorded_at, _ = next(iter(entries.values()))
+            if recorded_at >= cutoff and len(entries) <= self.max_per_guild:
+                break
+            entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def lookup(self, guild_id: int, action: Any, target_id: int) -> Optional[Any]:
+        """Get the indexed entry for an action on a target, if it is recent"""
+        entries = self._guilds.get(guild_id)
+        if not entries:
+            return None
+        item = entries.get((action, target_id))
+        if item is None or item[0] < time.monotonic() - self.ttl:
+            return None
+        self.stats["hits"] += 1
+        return item[1]
+
+    async def resolve(self, guild_id: int, action: Any, target_id: int, timeout: float) -> Optional[Any]:
+        """Get the entry for an action on a target, waiting up to timeout for the gateway to push it"""
+        entry = self.lookup(guild_id, action, target_id)
+        if entry is not None:
+            return entry
+
+        key = (guild_id, action, target_id)
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(key, []).append(future)
+        self.stats["waits"] += 1
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            return None
+        finally:
+            waiters = self._waiters.get(key)
+            if waiters is not None:
+                if future in waiters:
+                    waiters.remove(future)
+                if not waiters:
+                    del self._waiters[key]
+
+    def forget_guild(self, guild_id: int):
+        """Drop all entries of a guild the bot left"""
+        self._guilds.pop(guild_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get indexed entry count and hit/wait counters"""
+        return {
+            **self.stats,
+            "entries": sum(len(entries) for entries in self._guilds.values()),
+            "guilds": len(self._guilds),
+            "waiting": sum(len(waiters) for waiters in self._waiters.values())
+        }
@@ -0,0 +1,80 @@
+"""
+Dorothy Bot - Blacklist Matcher Benchmark
+Time per message of the blacklist check for growing blacklists
+
+Usage:
+    python benchmark_blacklist.py [--messages 2000] [--length 100] [--sizes 8,100,1000,10000]
+
+Compares the original scan (`word in text` for every word), one compiled
+regex alternation and the Aho-Corasick automaton on the same synthetic
+messages of random lowercase words. Almost none of them contain a
+blacklisted word, the common case and the worst case for every method,
+since each has to look at the whole message. BlacklistMatcher picks the regex below
+BLACKLIST_AUTOMATON_MIN_WORDS words and the automaton from there on.
+"""
+
+import argparse
+import random
+import re
+import string
+import time
+from typing import Callable, List
+from config import DEFAULT_BLACKLIST, BLACKLIST_AUTOMATON_MIN_WORDS
+from matchers import BlacklistMatcher
+
+def random_word(rng: random.Random, low: int, high: int) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(low, high)))
+
+def make_messages(rng: random.Random, count: int, length: int) -> List[str]:
+    messages = []
+    for _ in range(count):
+        words = []
+        while sum(len(word) + 1 for word in words) < length:
+            words.append(random_word(rng, 2, 8))
+        messages.append(" ".join(words)[:length])
+    return messages
+
+def make_blacklist(rng: random.Random, size: int) -> List[str]:
+    words = set(DEFAULT_BLACKLIST[:size])
+    while len(words) < size:
+        words.add(random_word(rng, 6, 10))
+    return sorted(words)
+
+def time_per_message(search: Callable[[str], object], messages: List[str], budget: float = 0.5) -> float:
+    """Microseconds per message, repeating the corpus for at least `budget` seconds"""
+    rounds = 0
+    started = time.perf_counter()
+    while True:
+        for text in messages:
+            search(text)
+        rounds += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= budget:
+            return elapsed / (rounds * len(messages)) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark blacklist matching methods")
+    parser.add_argument("--messages", type=int, default=2000, help="Synthetic messages per run")
+    parser.add_argument("--length", type=int, default=100, help="Characters per message")
+    parser.add_argument("--sizes", default="8,100,1000,10000", help="Comma-separated blacklist sizes")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    messages = make_messages(rng, args.messages, args.length)
+    print(f"{args.messages} messages of {args.length} characters, automaton from {BLACKLIST_AUTOMATON_MIN_WORDS} words")
+    print(f"{'words':>6}  {'scan':>10}  {'regex':>10}  {'automaton':>10}  {'matcher':>10}  (µs per message)")
+
+    for size in (int(size) for size in args.sizes.split(",")):
+        words = make_blacklist(rng, size)
+        regex = BlacklistMatcher(words, automaton_min_words=size + 1)
+        automaton = BlacklistMatcher(words, automaton_min_words=0)
+        matcher = BlacklistMatcher(words)
+        scan = lambda text: next((word for word in words if word in text), None)
+        for text in messages:
+            assert (scan(text) is None) == (regex.search(text) is None) == (automaton.search(text) is None)
+
+        timings = [time_per_message(search, messages) for search in (scan, regex.search, automaton.search, matcher.search)]
+        print(f"{size:>6}  " + "  ".join(f"{timing:>10.2f}" for timing in timings))
+
+if __name__ == "__main__":
+    main()
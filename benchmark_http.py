@@ -0,0 +1,101 @@
+"""
+Dorothy Bot - HTTP Pooling Benchmark
+Latency of sentiment requests with the shared pooled session vs. a new session per request
+
+Usage:
+    python benchmark_http.py [--requests 400] [--concurrency 8] [--latency 0.03] [--url URL]
+
+Without --url a local mock of the completions endpoint is started. It serves
+plain HTTP on loopback, so connection setup costs far less than against the
+real API (no DNS, TLS or network round trips): the pooled gain measured
+there is a lower bound. With --url, NVIDIA_API_KEY is sent as usual.
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Dict, List
+import aiohttp
+from aiohttp import web
+import doro_ai
+from doro_ai import classify_batch, start_http_session, close_http_session
+from utils import latency_percentiles
+
+MESSAGES = ["hello dorothy", "i am so sad today", "haha that is great", "are you awake?", "sorry about that"]
+
+async def start_mock(latency: float) -> web.AppRunner:
+    """Serve a minimal completions endpoint on 127.0.0.1:8765"""
+    async def completions(request: web.Request) -> web.Response:
+        await request.json()
+        await asyncio.sleep(latency)
+        return web.json_response({"choices": [{"message": {"content": "happy"}}]})
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", completions)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 8765).start()
+    return runner
+
+async def unpooled_request(message: str, url: str):
+    """How analyze_sentiment called the API before the shared session: a new session per call"""
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=doro_ai.NVIDIA_API_TIMEOUT)) as session:
+        return await classify_batch([message], session=session, url=url)
+
+async def pooled_request(message: str, url: str):
+    return await classify_batch([message], url=url)
+
+async def run(mode: str, request, count: int, concurrency: int, url: str) -> Dict[str, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    failures = 0
+
+    async def one(index: int):
+        nonlocal failures
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await request(MESSAGES[index % len(MESSAGES)], url)
+            except Exception:
+                failures += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(count)))
+    elapsed = time.perf_counter() - started
+    stats = latency_percentiles(latencies)
+    print(f"{mode:>9}: p50 {stats['p50']:7.2f} ms  p95 {stats['p95']:7.2f} ms  p99 {stats['p99']:7.2f} ms  "
+          f"max {stats['max']:7.2f} ms  {count / elapsed:7.1f} req/s  failures {failures}")
+    return stats
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark pooled vs. unpooled sentiment requests")
+    parser.add_argument("--requests", type=int, default=400, help="Requests per mode")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at once")
+    parser.add_argument("--latency", type=float, default=0.03, help="Mock server response delay in seconds")
+    parser.add_argument("--url", help="Real completions endpoint (default: local mock)")
+    args = parser.parse_args()
+
+    runner = None
+    url = args.url
+    if url is None:
+        runner = await start_mock(args.latency)
+        url = "http://127.0.0.1:8765/v1/chat/completions"
+
+    try:
+        # Warm-up so neither mode pays one-off import/DNS costs
+        await unpooled_request(MESSAGES[0], url)
+        await start_http_session()
+        await pooled_request(MESSAGES[0], url)
+
+        print(f"{args.requests} requests per mode, concurrency {args.concurrency}, {url}")
+        await run("unpooled", unpooled_request, args.requests, args.concurrency, url)
+        await run("pooled", pooled_request, args.requests, args.concurrency, url)
+    finally:
+        await close_http_session()
+        if runner is not None:
+            await runner.cleanup()
+
+if __name__ == "__main__":
+    asyncio.run(main())
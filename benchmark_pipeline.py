@@ -0,0 +1,158 @@
+"""
+Dorothy Bot - Message Pipeline Benchmark
+Replays a synthetic corpus of guild messages through on_message and reports messages per second
+
+Usage:
+    python benchmark_pipeline.py [--messages 20000] [--guilds 20] [--users 200] [--burst 100] [--seed 0]
+
+Messages go through the real handlers: on_message, the per-guild queues,
+feature extraction, spam and auto-mod checks and command-spam tracking.
+Nothing is sent to Discord. Responses to detections (deletes, timeouts,
+logs) and command processing would need a live connection, so they are
+counted instead of run. The "checks" line times feature extraction and
+the two checks alone, without the queues, on the same corpus.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from types import SimpleNamespace
+from typing import List
+import database
+import events
+from database import DataManager
+from message_queue import message_queues
+from security import SecurityManager
+from config import DEFAULT_BLACKLIST
+
+WORDS = ["doro", "hello", "game", "tonight", "anyone", "lol", "nice", "thanks", "what", "server",
+         "music", "play", "later", "cool", "yes", "no", "maybe", "today", "meme", "good"]
+
+# (kind, weight) of the synthetic messages
+MIX = [("normal", 86), ("duplicate", 5), ("caps", 4), ("invite", 2), ("blacklisted", 2), ("mentions", 1)]
+
+class HarnessTree:
+    def command(self, **kwargs):
+        return lambda func: func
+
+class HarnessBot:
+    """Just enough of commands.Bot for setup_events to register its handlers"""
+
+    def __init__(self):
+        self.handlers = {}
+        self.tree = HarnessTree()
+        self.guilds = []
+        self.user = SimpleNamespace(id=1, mention="<@1>", mentioned_in=lambda message: False)
+
+    def event(self, func):
+        self.handlers[func.__name__] = func
+        return func
+
+    async def process_commands(self, message):
+        pass
+
+class HarnessSecurityManager(SecurityManager):
+    """Counts the background work the pipeline hands off instead of running it"""
+
+    def __init__(self, bot, data_manager: DataManager):
+        super().__init__(bot, data_manager)
+        self.spawned = Counter()
+
+    def spawn(self, coro):
+        self.spawned[coro.__name__] += 1
+        coro.close()
+
+def make_corpus(rng: random.Random, count: int, guild_count: int, user_count: int) -> List[SimpleNamespace]:
+    guilds = [SimpleNamespace(id=1000 + index, name=f"guild-{index}") for index in range(guild_count)]
+    channels = [SimpleNamespace(id=5000 + index) for index in range(guild_count)]
+    users = [SimpleNamespace(id=100000 + index, bot=False, mention=f"<@{100000 + index}>") for index in range(user_count)]
+    kinds, weights = zip(*MIX)
+
+    corpus = []
+    for _ in range(count):
+        guild_index = rng.randrange(guild_count)
+        kind = rng.choices(kinds, weights)[0]
+        text = " ".join(rng.choices(WORDS, k=rng.randint(3, 15)))
+        mentions = []
+        if kind == "duplicate":
+            text = "join my server for free nitro!!!"
+        elif kind == "caps":
+            text = text.upper()
+        elif kind == "invite":
+            text += " discord.gg/" + "".join(rng.choices("abcdefgh", k=8))
+        elif kind == "blacklisted":
+            text += " " + rng.choice(DEFAULT_BLACKLIST)
+        elif kind == "mentions":
+            mentions = rng.sample(users, 8)
+            text = " ".join(user.mention for user in mentions)
+        corpus.append(SimpleNamespace(
+            content=text, author=rng.choice(users), guild=guilds[guild_index],
+            channel=channels[guild_index], mentions=mentions, mention_everyone=False
+        ))
+    return corpus
+
+def new_managers(directory: str, name: str):
+    data_manager = DataManager(os.path.join(directory, f"{name}.json"))
+    database.set_data_manager(data_manager)
+    return data_manager, HarnessSecurityManager(None, data_manager)
+
+async def run_checks(corpus: List[SimpleNamespace], directory: str) -> float:
+    _, security_manager = new_managers(directory, "checks")
+    started = time.perf_counter()
+    for message in corpus:
+        features = security_manager.extract_features(message)
+        if not await security_manager.check_spam(message, features):
+            await security_manager.check_auto_mod(message, features)
+    return time.perf_counter() - started
+
+async def run_pipeline(corpus: List[SimpleNamespace], directory: str, burst: int):
+    data_manager, security_manager = new_managers(directory, "pipeline")
+    bot = HarnessBot()
+    events.setup_events(bot, data_manager, security_manager)
+    on_message = bot.handlers["on_message"]
+
+    started = time.perf_counter()
+    for offset in range(0, len(corpus), burst):
+        for message in corpus[offset:offset + burst]:
+            await on_message(message)
+        # One gateway batch at a time: let the workers run before the next burst arrives
+        await asyncio.sleep(0)
+    while True:
+        stats = message_queues.get_stats()
+        if stats["processed"] + stats["failed"] == stats["enqueued"]:
+            break
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - started
+
+    waits = [message_queues.guild_stats(guild_id)["wait_ms"] for guild_id in {message.guild.id for message in corpus}]
+    await message_queues.close()
+    return elapsed, stats, security_manager.spawned, max(wait["p99"] for wait in waits)
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark the guild message pipeline")
+    parser.add_argument("--messages", type=int, default=20000, help="Messages in the corpus")
+    parser.add_argument("--guilds", type=int, default=20, help="Guilds the messages are spread over")
+    parser.add_argument("--users", type=int, default=200, help="Distinct authors")
+    parser.add_argument("--burst", type=int, default=100, help="Messages delivered per event loop turn")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus random seed")
+    args = parser.parse_args()
+
+    corpus = make_corpus(random.Random(args.seed), args.messages, args.guilds, args.users)
+    print(f"{args.messages} messages, {args.guilds} guilds, {args.users} users, bursts of {args.burst}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        elapsed = await run_checks(corpus, directory)
+        print(f"  checks: {args.messages / elapsed:9.0f} msg/s  ({elapsed / args.messages * 1e6:.1f} µs per message)")
+
+        elapsed, stats, spawned, worst_p99 = await run_pipeline(corpus, directory, args.burst)
+        print(f"pipeline: {args.messages / elapsed:9.0f} msg/s  ({elapsed / args.messages * 1e6:.1f} µs per message)")
+        print(f"          processed {stats['processed']}  failed {stats['failed']}  overflowed {stats['overflowed']}  "
+              f"worst guild p99 wait {worst_p99:.2f} ms")
+        print(f"          spam {spawned['respond_to_spam']}  auto-mod {spawned['respond_to_auto_mod']}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
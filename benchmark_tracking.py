@@ -0,0 +1,88 @@
+"""
+Dorothy Bot - Rate Tracking Benchmark
+Spam tracking cost per message: the old ISO-string lists vs. RateTracker
+
+Usage:
+    python benchmark_tracking.py [--messages 100000] [--users 1000] [--guilds 10] [--rate 10000]
+
+The "list/iso" method is the tracking the bot used before tracking.py:
+append {"content", "timestamp": isoformat} to a per-user list in the
+data dict, keep the last 10 and re-parse every timestamp with
+datetime.fromisoformat to count messages in the spam window. "tracker"
+makes the same RateTracker hit as DataManager.track_message: monotonic
+floats in a TrackerStore with the production budget and idle TTL. Both
+record and count every message of the same synthetic stream.
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Tuple
+from config import SPAM_TIME_WINDOW, TRACKER_MAX_KEYS, TRACKER_IDLE_TTL
+from tracking import TrackerStore
+
+def legacy_track_message(data: Dict, guild_id: str, user_id: str, content: str) -> int:
+    """track_message plus the window count of check_spam, as they were before RateTracker"""
+    if guild_id not in data["spam_tracking"]:
+        data["spam_tracking"][guild_id] = {}
+    if user_id not in data["spam_tracking"][guild_id]:
+        data["spam_tracking"][guild_id][user_id] = []
+
+    data["spam_tracking"][guild_id][user_id].append({
+        "content": content,
+        "timestamp": datetime.now().isoformat()
+    })
+    # Keep only last 10 messages
+    data["spam_tracking"][guild_id][user_id] = data["spam_tracking"][guild_id][user_id][-10:]
+    recent_messages = data["spam_tracking"][guild_id][user_id]
+
+    window_start = datetime.now() - timedelta(seconds=SPAM_TIME_WINDOW)
+    spam_count = 0
+    for msg in recent_messages:
+        if datetime.fromisoformat(msg["timestamp"]) >= window_start:
+            spam_count += 1
+    return spam_count
+
+def make_stream(rng: random.Random, count: int, guild_count: int, user_count: int) -> List[Tuple[str, str, str]]:
+    """(guild id, user id, content) per message; users post unevenly, like real chat"""
+    users = [str(100000 + index) for index in range(user_count)]
+    weights = [1 / (rank + 1) for rank in range(user_count)]
+    return [
+        (str(1000 + rng.randrange(guild_count)), user, f"message {index % 50}")
+        for index, user in enumerate(rng.choices(users, weights, k=count))
+    ]
+
+def run(name: str, track: Callable[[str, str, str], int], stream: List[Tuple[str, str, str]], rate: int) -> float:
+    started = time.perf_counter()
+    for guild_id, user_id, content in stream:
+        track(guild_id, user_id, content)
+    per_message = (time.perf_counter() - started) / len(stream) * 1e6
+    print(f"{name:>9}: {per_message:6.2f} µs per message  {1e6 / per_message:10.0f} msg/s  "
+          f"{per_message * rate / 1e4:5.1f}% of a core at {rate} msg/s")
+    return per_message
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark list/ISO spam tracking vs. RateTracker")
+    parser.add_argument("--messages", type=int, default=100000, help="Messages tracked per method")
+    parser.add_argument("--users", type=int, default=1000, help="Distinct authors")
+    parser.add_argument("--guilds", type=int, default=10, help="Guilds the messages are spread over")
+    parser.add_argument("--rate", type=int, default=10000, help="Message rate the CPU share is reported for")
+    args = parser.parse_args()
+
+    stream = make_stream(random.Random(0), args.messages, args.guilds, args.users)
+    print(f"{args.messages} messages, {args.users} users, {args.guilds} guilds")
+
+    data = {"spam_tracking": {}}
+    legacy = run("list/iso", lambda guild_id, user_id, content: legacy_track_message(data, guild_id, user_id, content),
+                 stream, args.rate)
+
+    trackers = TrackerStore(TRACKER_MAX_KEYS, idle_ttl=TRACKER_IDLE_TTL)
+    message_tracker = trackers.tracker("messages", SPAM_TIME_WINDOW, maxlen=10)
+    # Same call as DataManager.track_message, which tracks the content hash
+    tracker = run("tracker", lambda guild_id, user_id, content: message_tracker.hit((guild_id, user_id), hash(content)),
+                  stream, args.rate)
+    print(f"speedup: {legacy / tracker:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,7 @@ Contains all configuration settings, constants, and environment variables
 """
 
 import os
-from typing import List
+from typing import List, Optional
 
 # ==================== BOT CONFIGURATION ====================
 BOT_NAME = "Dorothy"
@@ -25,7 +25,55 @@ else:
 
 # ==================== API CONFIGURATION ====================
 NVIDIA_API_KEY = os.getenv('NVIDIA_API_KEY', '')
-NVIDIA_API_URL = "https://integrate.api.nvidia.com/v1/chat/completions"
+NVIDIA_API_URL = os.getenv('NVIDIA_API_URL', "https://integrate.api.nvidia.com/v1/chat/completions")
+NVIDIA_API_TIMEOUT = 2  # Seconds for a whole sentiment request
+NVIDIA_API_CONNECT_TIMEOUT = 1  # Seconds to open a new connection
+
+# Shared HTTP client (keep-alive connection pool)
+HTTP_POOL_LIMIT = 20  # Max open connections in total
+HTTP_POOL_LIMIT_PER_HOST = 10  # Max open connections per host
+HTTP_KEEPALIVE_TIMEOUT = 60  # Seconds an idle connection is kept open
+
+# Sentiment result cache
+SENTIMENT_CACHE_SIZE = 2048  # Max cached messages (LRU eviction)
+SENTIMENT_CACHE_TTL = 600  # Seconds a cached sentiment stays valid
+
+# Sentiment request batching
+SENTIMENT_BATCH_SIZE = 16  # Max messages classified in one API request
+SENTIMENT_BATCH_WINDOW = 0.02  # Seconds to wait for more messages before sending a batch
+
+# Sentiment API circuit breaker
+SENTIMENT_LATENCY_BUDGET = 1.5  # Seconds a sentiment request may take before it is abandoned
+SENTIMENT_SLOW_CALL = 1.0  # Seconds after which a successful request still counts as a failure
+SENTIMENT_BREAKER_FAILURES = 3  # Consecutive failed/slow requests before the circuit opens
+SENTIMENT_BREAKER_COOLDOWN = 30  # Seconds to use the local classifier before probing the API again
+
+# ==================== DATA PERSISTENCE ====================
+DATA_BACKEND = os.getenv('DATA_BACKEND', 'json').lower()  # "json", "sqlite" or "journal"
+DATA_DB_PATH = os.getenv('DATA_DB_PATH', 'dorothy_data.db')  # SQLite database file
+DATA_FLUSH_INTERVAL = float(os.getenv('DATA_FLUSH_INTERVAL', '5'))  # Seconds between write-behind flushes
+JOURNAL_COMPACT_OPS = int(os.getenv('JOURNAL_COMPACT_OPS', '1000'))  # Journal records before snapshot compaction
+
+# ==================== SHARDING ====================
+def parse_shard_ids(value: str) -> Optional[List[int]]:
+    """Parse a shard range like "0-3" or a list like "0,2,5" (None when empty)"""
+    shard_ids = []
+    for part in value.replace(' ', '').split(','):
+        if '-' in part:
+            first, last = part.split('-', 1)
+            shard_ids.extend(range(int(first), int(last) + 1))
+        elif part:
+            shard_ids.append(int(part))
+    return sorted(set(shard_ids)) or None
+
+SHARD_COUNT = int(os.getenv('SHARD_COUNT', '0')) or None  # Total shards across all processes (None = Discord's recommendation)
+SHARD_IDS = parse_shard_ids(os.getenv('SHARD_IDS', ''))  # Shards run by this process (None = all)
+if SHARD_IDS is not None and (SHARD_COUNT is None or max(SHARD_IDS) >= SHARD_COUNT):
+    raise ValueError("SHARD_IDS needs SHARD_COUNT set above its highest shard id")
+if SHARD_IDS is not None and DATA_BACKEND != "sqlite":
+    # The JSON and journal backends rewrite the whole data file: several processes would overwrite each other
+    raise ValueError("SHARD_IDS (several bot processes) needs DATA_BACKEND=sqlite")
+POLICY_CACHE_TTL = 10  # Seconds a cached server settings snapshot is trusted when other processes share the database
 
 # ==================== DORO AI PATTERNS ====================
 doro_patterns = {
@@ -84,6 +132,10 @@ SPAM_DUPLICATE_THRESHOLD = 10  # Same message repeated
 COMMAND_SPAM_THRESHOLD = 10  # Commands within time window
 COMMAND_SPAM_WINDOW = 10  # Seconds
 
+# Tracking Memory Settings
+TRACKER_IDLE_TTL = 300  # Seconds without activity before a tracked user is forgotten
+TRACKER_MAX_KEYS = 50000  # Max tracked users/guilds across all trackers (LRU eviction)
+
 # DM Spam Settings
 DM_SPAM_THRESHOLD = 10  # DMs within time window
 DM_SPAM_WINDOW = 30  # Seconds
@@ -95,6 +147,35 @@ NUKE_DELETE_THRESHOLD = 5  # Multiple channel deletes
 NUKE_ROLE_DELETE_THRESHOLD = 3  # Multiple role deletes
 NUKE_TIME_WINDOW = 10  # Seconds
 
+# Alert DM Settings
+ALERT_WORKERS = 4  # DMs sent concurrently
+ALERT_QUEUE_SIZE = 1000  # Max queued alert DMs (extra alerts are dropped)
+ALERT_DEDUP_WINDOW = 60  # Seconds an identical alert is not resent to the same member
+ALERT_DIGEST_WINDOW = 10  # Seconds after an alert DM during which further alerts are merged into one
+
+# Outbound Action Scheduler Settings
+OUTBOUND_WORKERS = 8  # Discord requests in flight at once (containment actions bypass this)
+OUTBOUND_CLASS_LIMITS = {"enforcement": 8, "logging": 4, "chatter": 2}  # Max running per priority class
+OUTBOUND_ROUTE_LIMIT = 2  # Max requests of one class in flight per route (e.g. one channel's messages)
+OUTBOUND_QUEUE_LIMITS = {"logging": 1000, "chatter": 100}  # Max queued per class, oldest dropped (enforcement is never dropped)
+
+# Message Queue Settings
+MESSAGE_WORKERS = 16  # Messages handled concurrently across all guilds
+MESSAGE_QUEUE_SIZE = 200  # Max queued messages per guild (extra ones are only spam-checked inline)
+MESSAGE_GUILD_CONCURRENCY = 2  # Max messages of one guild handled at once
+MESSAGE_COSMETIC_WATERMARK = 0.5  # Queue fill (fraction) above which cosmetic work (mention replies) is refused
+
+# Log Channel Batching Settings
+LOG_BATCH_WINDOW = 2  # Seconds log embeds are buffered per channel before sending
+LOG_BATCH_MAX = 200  # Max buffered embeds per channel (extra ones are dropped)
+LOG_SUMMARY_THRESHOLD = 5  # Same-kind events in one batch before they collapse into a summary
+LOG_USE_WEBHOOKS = os.getenv('LOG_USE_WEBHOOKS', 'false').lower() == 'true'  # Send logs through channel webhooks
+
+# Audit Log Index Settings (entries pushed by the gateway)
+AUDIT_LOG_WAIT = 2  # Seconds to wait for the audit entry of a ban/kick/delete
+AUDIT_LOG_TTL = 60  # Seconds an audit entry stays indexed
+AUDIT_LOG_MAX_ENTRIES = 200  # Max indexed entries per guild
+
 # Auto-Moderation Settings
 AUTO_MOD_CAPS_THRESHOLD = 70  # Percentage of caps
 AUTO_MOD_CAPS_MIN_LENGTH = 10  # Minimum message length to check caps
@@ -106,6 +187,7 @@ DEFAULT_BLACKLIST = [
     "faggot", "fag", "retard", "kys",
     # Add more as needed
 ]
+BLACKLIST_AUTOMATON_MIN_WORDS = 64  # Blacklists this long use the Aho-Corasick automaton instead of one regex
 
 # Invite link patterns
 INVITE_PATTERNS = [
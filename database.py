@@ -3,10 +3,56 @@ Dorothy Bot - Database Module
 Handles all data persistence and management
 """
 
+import asyncio
 import json
 import os
+import tempfile
+import threading
+import time
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, FrozenSet, NamedTuple
+from tracking import TrackerStore
+from matchers import BlacklistMatcher, LinkDetector, INVITE_DETECTOR, normalize_domain
+
+class GuildPolicy(NamedTuple):
+    """Immutable snapshot of a server's effective settings, read on every message"""
+    anti_raid_enabled: bool
+    anti_spam_enabled: bool
+    anti_nuke_enabled: bool
+    auto_mod_enabled: bool
+    whitelisted_users: FrozenSet[int]
+    whitelisted_channels: FrozenSet[int]
+    prefix: str
+    language: str
+    blacklist: BlacklistMatcher
+    link_detector: LinkDetector
+    log_channel: Optional[int]
+
+# Process-wide shared instance (set in main.py, lazily created otherwise)
+_shared_data_manager: Optional["DataManager"] = None
+
+def set_data_manager(dm: "DataManager"):
+    """Register the shared data manager used by every module"""
+    global _shared_data_manager
+    _shared_data_manager = dm
+
+def get_data_manager() -> "DataManager":
+    """Get the shared data manager, loading it from disk only once"""
+    global _shared_data_manager
+    if _shared_data_manager is None:
+        _shared_data_manager = create_data_manager()
+    return _shared_data_manager
+
+def create_data_manager() -> "DataManager":
+    """Create a data manager for the configured storage backend"""
+    from config import DATA_BACKEND, DATA_DB_PATH, JOURNAL_COMPACT_OPS
+    if DATA_BACKEND == "sqlite":
+        from sqlite_database import SQLiteDataManager
+        return SQLiteDataManager(DATA_DB_PATH)
+    if DATA_BACKEND == "journal":
+        from journal_database import JournalDataManager
+        return JournalDataManager(compact_ops=JOURNAL_COMPACT_OPS)
+    return DataManager()
 
 class DataManager:
     """Manages all bot data including warnings, security settings, and configurations"""
@@ -14,10 +60,27 @@ class DataManager:
     def __init__(self, filename="dorothy_data.json"):
         self.filename = filename
         self.data = self.load_data()
+        self._init_manager_state()
         # Create initial save if file doesn't exist
         if not os.path.exists(self.filename):
             self.save_data()
     
+    def _init_manager_state(self):
+        """Set up the state shared by every backend (runtime caches and write-behind bookkeeping)"""
+        self._init_runtime_state()
+        
+        # Write-behind state: save_data() only marks the store dirty while
+        # the background flush task is running
+        self._dirty = False
+        self._flush_task: Optional[asyncio.Task] = None
+        self._write_lock = threading.Lock()
+        self.write_stats = {
+            "save_requests": 0,
+            "flushes": 0,
+            "last_flush_ms": 0.0,
+            "total_flush_ms": 0.0
+        }
+    
     def load_data(self) -> Dict:
         """Load data from JSON file"""
         if os.path.exists(self.filename):
@@ -37,9 +100,9 @@ class DataManager:
         # Add missing fields from new structure
         default = self._get_default_structure()
         
-        # Add command_spam_tracking if missing
-        if "command_spam_tracking" not in data:
-            data["command_spam_tracking"] = {}
+        # Drop ephemeral tracking state persisted by older versions
+        for key in ("spam_tracking", "raid_tracking", "nuke_tracking", "command_spam_tracking"):
+            data.pop(key, None)
         
         # Add dm_blocked_users if missing
         if "dm_blocked_users" not in data:
@@ -53,6 +116,10 @@ class DataManager:
         if "security" in data and "whitelisted_channels" not in data["security"]:
             data["security"]["whitelisted_channels"] = {}
         
+        # Add blocked_link_domains if missing in security section
+        if "security" in data and "blocked_link_domains" not in data["security"]:
+            data["security"]["blocked_link_domains"] = {}
+        
         return data
     
     def _get_default_structure(self) -> Dict:
@@ -73,24 +140,104 @@ class DataManager:
                 "whitelisted_users": {},
                 "whitelisted_channels": {},
                 "blacklisted_words": {},
+                "blocked_link_domains": {},
                 "trusted_roles": {},
                 "security_logs": {}
             },
-            "spam_tracking": {},
-            "raid_tracking": {},
-            "nuke_tracking": {},
-            "dm_blocked_users": {},
-            "command_spam_tracking": {}
+            "dm_blocked_users": {}
         }
     
     def save_data(self):
-        """Save data to JSON file"""
+        """Save data to JSON file (deferred to the next flush when write-behind is running)"""
+        self.write_stats["save_requests"] += 1
+        self._dirty = True
+        if self._flush_task is None:
+            self.flush()
+    
+    def _serialize(self) -> str:
+        """Snapshot current data as JSON text"""
+        return json.dumps(self.data, ensure_ascii=False, indent=2)
+    
+    def _write_file(self, payload: str):
+        """Atomically replace the data file (temp file + rename)"""
+        start = time.perf_counter()
+        with self._write_lock:
+            directory = os.path.dirname(os.path.abspath(self.filename))
+            fd, tmp_path = tempfile.mkstemp(prefix=".dorothy_", suffix=".tmp", dir=directory)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.filename)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.write_stats["flushes"] += 1
+        self.write_stats["last_flush_ms"] = elapsed_ms
+        self.write_stats["total_flush_ms"] += elapsed_ms
+    
+    def flush(self):
+        """Write pending changes to disk immediately"""
+        if not self._dirty:
+            return
+        self._dirty = False
+        try:
+            self._write_file(self._serialize())
+        except Exception as e:
+            self._dirty = True
+            print(f"Error saving data: {e}")
+    
+    async def flush_async(self):
+        """Write pending changes from a worker thread without blocking the event loop"""
+        if not self._dirty:
+            return
+        self._dirty = False
+        # Serialize on the loop so the snapshot is consistent, write off the loop
+        payload = self._serialize()
         try:
-            with open(self.filename, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, ensure_ascii=False, indent=2)
+            await asyncio.to_thread(self._write_file, payload)
         except Exception as e:
+            self._dirty = True
             print(f"Error saving data: {e}")
     
+    def start_write_behind(self, interval: float = 5.0):
+        """Start coalescing saves into one flush per interval (requires a running loop)"""
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop(interval))
+    
+    async def _flush_loop(self, interval: float):
+        """Background task flushing dirty data every interval"""
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                await self.flush_async()
+        except asyncio.CancelledError:
+            pass
+    
+    async def close(self):
+        """Stop the write-behind task and force a final flush"""
+        task, self._flush_task = self._flush_task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await self.flush_async()
+    
+    def get_write_stats(self) -> Dict[str, float]:
+        """Get flush latency and coalescing ratio (save requests per disk write)"""
+        stats = dict(self.write_stats)
+        flushes = stats["flushes"]
+        stats["avg_flush_ms"] = stats["total_flush_ms"] / flushes if flushes else 0.0
+        stats["coalescing_ratio"] = stats["save_requests"] / flushes if flushes else 0.0
+        stats["dirty"] = self._dirty
+        return stats
+    
     # ==================== WARNING SYSTEM ====================
     def add_warning(self, guild_id: str, user_id: str, reason: str = "") -> int:
         """Add warning to user and return total warning count"""
@@ -130,6 +277,7 @@ class DataManager:
         """Set custom prefix for server"""
         guild_id = str(guild_id)
         self.data["prefixes"][guild_id] = prefix
+        self._invalidate_policy(guild_id)
         self.save_data()
     
     def get_prefix(self, guild_id: str) -> str:
@@ -145,6 +293,7 @@ class DataManager:
         if guild_id not in self.data["security"][setting]:
             self.data["security"][setting][guild_id] = {}
         self.data["security"][setting][guild_id] = enabled
+        self._invalidate_policy(guild_id)
         self.save_data()
     
     def get_security_setting(self, guild_id: str, setting: str, default: bool = True) -> bool:
@@ -162,6 +311,7 @@ class DataManager:
             self.data["security"]["whitelisted_users"][guild_id] = []
         if user_id not in self.data["security"]["whitelisted_users"][guild_id]:
             self.data["security"]["whitelisted_users"][guild_id].append(user_id)
+            self._invalidate_policy(guild_id)
             self.save_data()
     
     def remove_whitelist(self, guild_id: str, user_id: str):
@@ -170,6 +320,7 @@ class DataManager:
         if guild_id in self.data["security"]["whitelisted_users"]:
             if user_id in self.data["security"]["whitelisted_users"][guild_id]:
                 self.data["security"]["whitelisted_users"][guild_id].remove(user_id)
+                self._invalidate_policy(guild_id)
                 self.save_data()
     
     def is_whitelisted(self, guild_id: str, user_id: str) -> bool:
@@ -187,6 +338,7 @@ class DataManager:
             self.data["security"]["whitelisted_channels"][guild_id] = []
         if channel_id not in self.data["security"]["whitelisted_channels"][guild_id]:
             self.data["security"]["whitelisted_channels"][guild_id].append(channel_id)
+            self._invalidate_policy(guild_id)
             self.save_data()
     
     def remove_whitelist_channel(self, guild_id: str, channel_id: str):
@@ -195,6 +347,7 @@ class DataManager:
         if guild_id in self.data["security"]["whitelisted_channels"]:
             if channel_id in self.data["security"]["whitelisted_channels"][guild_id]:
                 self.data["security"]["whitelisted_channels"][guild_id].remove(channel_id)
+                self._invalidate_policy(guild_id)
                 self.save_data()
     
     def is_channel_whitelisted(self, guild_id: str, channel_id: str) -> bool:
@@ -213,6 +366,7 @@ class DataManager:
         word_lower = word.lower()
         if word_lower not in self.data["security"]["blacklisted_words"][guild_id]:
             self.data["security"]["blacklisted_words"][guild_id].append(word_lower)
+            self._invalidate_policy(guild_id)
             self.save_data()
     
     def remove_blacklist_word(self, guild_id: str, word: str):
@@ -222,6 +376,7 @@ class DataManager:
             word_lower = word.lower()
             if word_lower in self.data["security"]["blacklisted_words"][guild_id]:
                 self.data["security"]["blacklisted_words"][guild_id].remove(word_lower)
+                self._invalidate_policy(guild_id)
                 self.save_data()
     
     def get_blacklist_words(self, guild_id: str) -> List[str]:
@@ -231,79 +386,126 @@ class DataManager:
         server_blacklist = self.data["security"]["blacklisted_words"].get(guild_id, [])
         return list(set(DEFAULT_BLACKLIST + server_blacklist))
     
+    def get_blacklist_matcher(self, guild_id: str) -> BlacklistMatcher:
+        """Get the compiled blacklist matcher for server (built lazily, rebuilt after blacklist changes)"""
+        return self.get_policy(guild_id).blacklist
+    
+    # ==================== BLOCKED LINKS ====================
+    def add_blocked_domain(self, guild_id: str, domain: str):
+        """Add link domain (vanity invite, URL shortener...) to server block list"""
+        guild_id = str(guild_id)
+        if guild_id not in self.data["security"]["blocked_link_domains"]:
+            self.data["security"]["blocked_link_domains"][guild_id] = []
+        domain = normalize_domain(domain)
+        if domain and domain not in self.data["security"]["blocked_link_domains"][guild_id]:
+            self.data["security"]["blocked_link_domains"][guild_id].append(domain)
+            self._invalidate_policy(guild_id)
+            self.save_data()
+    
+    def remove_blocked_domain(self, guild_id: str, domain: str):
+        """Remove link domain from server block list"""
+        guild_id = str(guild_id)
+        if guild_id in self.data["security"]["blocked_link_domains"]:
+            domain = normalize_domain(domain)
+            if domain in self.data["security"]["blocked_link_domains"][guild_id]:
+                self.data["security"]["blocked_link_domains"][guild_id].remove(domain)
+                self._invalidate_policy(guild_id)
+                self.save_data()
+    
+    def get_blocked_domains(self, guild_id: str) -> List[str]:
+        """Get blocked link domains for server"""
+        guild_id = str(guild_id)
+        return list(self.data["security"]["blocked_link_domains"].get(guild_id, []))
+    
+    def get_link_detector(self, guild_id: str) -> LinkDetector:
+        """Get the compiled link detector for server (invites plus its blocked domains)"""
+        return self.get_policy(guild_id).link_detector
+    
+    # ==================== GUILD POLICY ====================
+    def get_policy(self, guild_id: str) -> GuildPolicy:
+        """Get the cached effective settings snapshot for server"""
+        guild_id = str(guild_id)
+        policy = self._policies.get(guild_id)
+        if policy is not None and self.policy_ttl is not None \
+                and time.monotonic() - self._policy_built[guild_id] > self.policy_ttl:
+            policy = None  # Another process may have changed the settings
+        if policy is None:
+            policy = self._policies[guild_id] = self._build_policy(guild_id)
+            if self.policy_ttl is not None:
+                self._policy_built[guild_id] = time.monotonic()
+        return policy
+    
+    def _build_policy(self, guild_id: str) -> GuildPolicy:
+        """Build a settings snapshot through the regular getters (works for every backend)"""
+        domains = self.get_blocked_domains(guild_id)
+        return GuildPolicy(
+            anti_raid_enabled=self.get_security_setting(guild_id, "anti_raid_enabled", True),
+            anti_spam_enabled=self.get_security_setting(guild_id, "anti_spam_enabled", True),
+            anti_nuke_enabled=self.get_security_setting(guild_id, "anti_nuke_enabled", True),
+            auto_mod_enabled=self.get_security_setting(guild_id, "auto_mod_enabled", True),
+            whitelisted_users=frozenset(int(u) for u in self._get_id_list("whitelisted_users", guild_id)),
+            whitelisted_channels=frozenset(int(c) for c in self._get_id_list("whitelisted_channels", guild_id)),
+            prefix=self.get_prefix(guild_id),
+            language=self.get_language(guild_id),
+            blacklist=BlacklistMatcher(self.get_blacklist_words(guild_id)),
+            link_detector=INVITE_DETECTOR.with_domains(domains) if domains else INVITE_DETECTOR,
+            log_channel=self.get_log_channel(guild_id)
+        )
+    
+    def _get_id_list(self, section: str, guild_id: str) -> List[str]:
+        """Get whitelisted user/channel IDs for server"""
+        return self.data["security"].get(section, {}).get(guild_id, [])
+    
+    def _invalidate_policy(self, guild_id: str):
+        """Drop the cached snapshot so the next read builds a fresh one"""
+        self._policies.pop(str(guild_id), None)
+    
     # ==================== SPAM TRACKING ====================
-    def track_message(self, guild_id: str, user_id: str, content: str) -> List[Dict]:
-        """Track user message for spam detection"""
-        guild_id, user_id = str(guild_id), str(user_id)
-        
-        if guild_id not in self.data["spam_tracking"]:
-            self.data["spam_tracking"][guild_id] = {}
-        if user_id not in self.data["spam_tracking"][guild_id]:
-            self.data["spam_tracking"][guild_id][user_id] = []
-        
-        message_data = {
-            "content": content,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        self.data["spam_tracking"][guild_id][user_id].append(message_data)
-        
-        # Keep only last 10 messages
-        self.data["spam_tracking"][guild_id][user_id] = \
-            self.data["spam_tracking"][guild_id][user_id][-10:]
-        
-        return self.data["spam_tracking"][guild_id][user_id]
+    def _init_runtime_state(self):
+        """Create in-memory trackers and caches (ephemeral, never persisted)"""
+        self._policies: Dict[str, GuildPolicy] = {}
+        self._policy_built: Dict[str, float] = {}  # Monotonic build time, only kept with a policy TTL
+        self.policy_ttl: Optional[float] = None  # Seconds a snapshot stays valid (None = until invalidated)
+        from config import (
+            SPAM_TIME_WINDOW, RAID_DETECTION_WINDOW, NUKE_TIME_WINDOW, COMMAND_SPAM_WINDOW, DM_SPAM_WINDOW,
+            TRACKER_IDLE_TTL, TRACKER_MAX_KEYS
+        )
+        self.trackers = TrackerStore(TRACKER_MAX_KEYS, idle_ttl=TRACKER_IDLE_TTL)
+        self.message_tracker = self.trackers.tracker("messages", SPAM_TIME_WINDOW, maxlen=10)
+        self.dm_tracker = self.trackers.tracker("dms", DM_SPAM_WINDOW, maxlen=10)
+        self.join_tracker = self.trackers.tracker("joins", RAID_DETECTION_WINDOW, maxlen=50)
+        self.nuke_tracker = self.trackers.tracker("nuke", NUKE_TIME_WINDOW, maxlen=20)
+        self.command_tracker = self.trackers.tracker("commands", COMMAND_SPAM_WINDOW, maxlen=10)
+    
+    def get_tracking_stats(self) -> Dict[str, Any]:
+        """Get live tracked keys and eviction counters"""
+        return self.trackers.get_stats()
+    
+    def track_message(self, guild_id: str, user_id: str, content: Any) -> int:
+        """Track user message (content or its hash) for spam detection and return messages in the spam window"""
+        return self.message_tracker.hit((str(guild_id), str(user_id)), content)
+    
+    def get_recent_messages(self, guild_id: str, user_id: str) -> List[Any]:
+        """Get what was tracked for the user's last messages (oldest first)"""
+        return self.message_tracker.recent((str(guild_id), str(user_id)))
     
     def clear_spam_tracking(self, guild_id: str, user_id: str):
         """Clear spam tracking for user"""
-        guild_id, user_id = str(guild_id), str(user_id)
-        if guild_id in self.data["spam_tracking"]:
-            if user_id in self.data["spam_tracking"][guild_id]:
-                del self.data["spam_tracking"][guild_id][user_id]
+        self.message_tracker.clear((str(guild_id), str(user_id)))
+    
+    def track_dm(self, user_id: str, content: str) -> int:
+        """Track DM to the bot and return DMs in the DM spam window"""
+        return self.dm_tracker.hit(str(user_id), content)
     
     # ==================== RAID TRACKING ====================
-    def track_join(self, guild_id: str, user_id: str) -> List[Dict]:
-        """Track user join for raid detection"""
-        guild_id, user_id = str(guild_id), str(user_id)
-        
-        if guild_id not in self.data["raid_tracking"]:
-            self.data["raid_tracking"][guild_id] = []
-        
-        join_data = {
-            "user_id": user_id,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        self.data["raid_tracking"][guild_id].append(join_data)
-        
-        # Keep only last 50 joins
-        self.data["raid_tracking"][guild_id] = \
-            self.data["raid_tracking"][guild_id][-50:]
-        
-        return self.data["raid_tracking"][guild_id]
+    def track_join(self, guild_id: str, user_id: str) -> int:
+        """Track user join for raid detection and return joins in the raid window"""
+        return self.join_tracker.hit(str(guild_id), str(user_id))
     
     # ==================== NUKE TRACKING ====================
-    def track_moderation_action(self, guild_id: str, action_type: str, moderator_id: str) -> List[Dict]:
-        """Track moderation actions for nuke detection"""
-        guild_id, moderator_id = str(guild_id), str(moderator_id)
-        
-        if guild_id not in self.data["nuke_tracking"]:
-            self.data["nuke_tracking"][guild_id] = {}
-        if moderator_id not in self.data["nuke_tracking"][guild_id]:
-            self.data["nuke_tracking"][guild_id][moderator_id] = []
-        
-        action_data = {
-            "action": action_type,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        self.data["nuke_tracking"][guild_id][moderator_id].append(action_data)
-        
-        # Keep only last 20 actions
-        self.data["nuke_tracking"][guild_id][moderator_id] = \
-            self.data["nuke_tracking"][guild_id][moderator_id][-20:]
-        
-        return self.data["nuke_tracking"][guild_id][moderator_id]
+    def track_moderation_action(self, guild_id: str, action_type: str, moderator_id: str) -> int:
+        """Track moderation action for nuke detection and return same-type actions in the nuke window"""
+        return self.nuke_tracker.hit((str(guild_id), str(moderator_id), action_type))
     
     # ==================== SECURITY LOGS ====================
     def add_security_log(self, guild_id: str, log_type: str, details: Dict):
@@ -339,6 +541,7 @@ class DataManager:
         """Set language for server"""
         guild_id = str(guild_id)
         self.data["languages"][guild_id] = language
+        self._invalidate_policy(guild_id)
         self.save_data()
     
     def get_language(self, guild_id: str) -> str:
@@ -368,38 +571,25 @@ class DataManager:
             del self.data["dm_blocked_users"][user_id]
             self.save_data()
     
+    def get_dm_blocked_users(self) -> Dict[str, Dict]:
+        """Get all users blocked from DMing bot"""
+        return self.data.get("dm_blocked_users", {})
+    
     # ==================== COMMAND SPAM TRACKING ====================
-    def track_command(self, user_id: str, command_name: str) -> List[Dict]:
-        """Track user command for spam detection"""
-        user_id = str(user_id)
-        
-        if user_id not in self.data["command_spam_tracking"]:
-            self.data["command_spam_tracking"][user_id] = []
-        
-        command_data = {
-            "command": command_name,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        self.data["command_spam_tracking"][user_id].append(command_data)
-        
-        # Keep only last 10 commands
-        self.data["command_spam_tracking"][user_id] = \
-            self.data["command_spam_tracking"][user_id][-10:]
-        
-        return self.data["command_spam_tracking"][user_id]
+    def track_command(self, user_id: str, command_name: str) -> int:
+        """Track user command for spam detection and return commands in the command spam window"""
+        return self.command_tracker.hit(str(user_id), command_name)
     
     def clear_command_tracking(self, user_id: str):
         """Clear command tracking for user"""
-        user_id = str(user_id)
-        if user_id in self.data["command_spam_tracking"]:
-            self.data["command_spam_tracking"][user_id] = []
+        self.command_tracker.clear(str(user_id))
     
     # ==================== LOG CHANNEL SYSTEM ====================
     def set_log_channel(self, guild_id: str, channel_id: int):
         """Set log channel for server"""
         guild_id = str(guild_id)
         self.data["log_channels"][guild_id] = channel_id
+        self._invalidate_policy(guild_id)
         self.save_data()
     
     def get_log_channel(self, guild_id: str) -> Optional[int]:
@@ -412,4 +602,5 @@ class DataManager:
         guild_id = str(guild_id)
         if guild_id in self.data["log_channels"]:
             del self.data["log_channels"][guild_id]
+            self._invalidate_policy(guild_id)
             self.save_data()
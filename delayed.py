@@ -0,0 +1,99 @@
+"""
+Dorothy Bot - Delayed Actions Module
+Single-task scheduler for actions that run after a delay (e.g. deleting bot messages)
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import discord
+from outbound import outbound, CHATTER
+from utils import latency_percentiles
+
+class DelayedScheduler:
+    """Heap of (due time, callback) drained by one background task
+
+    Scheduling a job is a heap push: no coroutine or timer is kept per
+    job, so thousands of pending deletions cost one task. Callbacks run
+    synchronously on the loop when due and should only hand work off
+    (for example submit it to the outbound scheduler).
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, Callable[[], Any]]] = []
+        self._counter = itertools.count()  # Tie-breaker so callbacks are never compared
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"scheduled": 0, "executed": 0, "failed": 0}
+        self.lateness = deque(maxlen=500)  # Seconds between due time and run time
+
+    def start(self):
+        """Start the timer task (needs a running event loop)"""
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def schedule(self, delay: float, callback: Callable[[], Any]):
+        """Run callback after delay seconds"""
+        self.start()
+        due = time.monotonic() + delay
+        earliest = self._heap[0][0] if self._heap else None
+        heapq.heappush(self._heap, (due, next(self._counter), callback))
+        self.stats["scheduled"] += 1
+        if earliest is None or due < earliest:
+            self._wakeup.set()  # New head: the timer task must shorten its sleep
+
+    async def _run(self):
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0][0] - time.monotonic()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            now = time.monotonic()
+            while self._heap and self._heap[0][0] <= now:
+                due, _, callback = heapq.heappop(self._heap)
+                self.lateness.append(now - due)
+                try:
+                    callback()
+                    self.stats["executed"] += 1
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    print(f"[ERROR] Delayed action failed: {e}")
+
+    def delete_later(self, message: discord.Message, delay: float):
+        """Delete a message after delay seconds (low priority, errors ignored)"""
+        self.schedule(delay, lambda: outbound.submit(CHATTER, f"delete:{message.channel.id}", message.delete))
+
+    async def close(self):
+        """Stop the timer task (pending jobs are discarded)"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._wakeup = None
+        self._heap.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get counters, pending jobs and how late jobs ran"""
+        return {
+            **self.stats,
+            "pending": len(self._heap),
+            "lateness_ms": latency_percentiles(self.lateness)
+        }
+
+# Shared scheduler for every delayed action
+delayed = DelayedScheduler()
@@ -4,45 +4,354 @@ Handles Dorothy's AI responses and sentiment analysis
 """
 
 import aiohttp
+import asyncio
 import random
-from config import doro_patterns, doro_actions, NVIDIA_API_KEY, NVIDIA_API_URL
+import re
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from config import (
+    doro_patterns, doro_actions, NVIDIA_API_KEY, NVIDIA_API_URL, NVIDIA_API_TIMEOUT, NVIDIA_API_CONNECT_TIMEOUT,
+    HTTP_POOL_LIMIT, HTTP_POOL_LIMIT_PER_HOST, HTTP_KEEPALIVE_TIMEOUT, SENTIMENT_CACHE_SIZE, SENTIMENT_CACHE_TTL,
+    SENTIMENT_BATCH_SIZE, SENTIMENT_BATCH_WINDOW, SENTIMENT_LATENCY_BUDGET, SENTIMENT_SLOW_CALL,
+    SENTIMENT_BREAKER_FAILURES, SENTIMENT_BREAKER_COOLDOWN
+)
+from utils import latency_percentiles
+
+# Shared HTTP session (opened on bot startup, closed on shutdown)
+http_session: Optional[aiohttp.ClientSession] = None
+
+async def start_http_session() -> aiohttp.ClientSession:
+    """Open the shared keep-alive HTTP session"""
+    global http_session
+    if http_session is None or http_session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_LIMIT,
+            limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=300
+        )
+        http_session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=NVIDIA_API_TIMEOUT, connect=NVIDIA_API_CONNECT_TIMEOUT)
+        )
+    return http_session
+
+async def close_http_session():
+    """Close the shared HTTP session and its pooled connections"""
+    global http_session
+    if http_session is not None and not http_session.closed:
+        await http_session.close()
+    http_session = None
+
+class SentimentCache:
+    """Bounded LRU + TTL cache of sentiment results with single-flight lookups"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "coalesced": 0}
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, sentiment)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached sentiment, or None when missing or expired"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[1]
+            del self._entries[key]
+            self.stats["expired"] += 1
+        self.stats["misses"] += 1
+        return None
+
+    def set(self, key: str, sentiment: str):
+        """Store a sentiment, evicting the least recently used entries over the size limit"""
+        self._entries[key] = (time.monotonic() + self.ttl, sentiment)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Optional[str]]]) -> Optional[str]:
+        """Return the cached sentiment or fetch it, sharing one fetch between concurrent callers"""
+        sentiment = self.get(key)
+        if sentiment is not None:
+            return sentiment
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.stats["coalesced"] += 1
+            # Shield so a cancelled follower does not cancel the shared fetch
+            return await asyncio.shield(pending)
+
+        pending = asyncio.get_running_loop().create_future()
+        self._inflight[key] = pending
+        try:
+            sentiment = await fetch()
+            # Failed lookups (None) are not cached so the next call retries upstream
+            if sentiment is not None:
+                self.set(key, sentiment)
+        finally:
+            del self._inflight[key]
+            # Followers fall back on their own if the fetch failed or was cancelled
+            pending.set_result(sentiment)
+        return sentiment
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache size and hit/miss/eviction counters"""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "in_flight": len(self._inflight),
+            "hit_ratio": round(self.stats["hits"] / lookups, 3) if lookups else 0.0
+        }
+
+sentiment_cache = SentimentCache(SENTIMENT_CACHE_SIZE, SENTIMENT_CACHE_TTL)
+
+def normalize_message(message: str) -> str:
+    """Cache key for a message: lowercased with whitespace collapsed"""
+    return " ".join(message.lower().split())
 
 async def analyze_sentiment(message: str) -> str:
     """Analyze message sentiment using NVIDIA API or fallback"""
-    try:
-        # Try NVIDIA API first
-        if NVIDIA_API_KEY:
-            prompt = f"""Analyze sentiment of this message and return ONE word:
-happy, sad, confused, angry, scared, excited, neutral, apologetic, sleepy, or curious.
+    if NVIDIA_API_KEY:
+        key = normalize_message(message)
+        if sentiment_breaker.rejecting:
+            # Upstream is unhealthy: serve cached results only, never wait on the API
+            sentiment = sentiment_cache.get(key)
+        else:
+            sentiment = await sentiment_cache.get_or_fetch(key, lambda: sentiment_batcher.submit(message))
+        if sentiment is not None:
+            return sentiment
+
+    # Fallback analysis
+    return analyze_simple(message)
 
-Message: "{message}"
+SENTIMENT_WORDS = "happy, sad, confused, angry, scared, excited, neutral, apologetic, sleepy, or curious"
+BATCH_LINE_RE = re.compile(r'^\s*(\d+)\s*[:.)\-]\s*([a-z]+)', re.MULTILINE)
+
+def build_sentiment_prompt(messages: List[str]) -> str:
+    """Prompt classifying one message, or a numbered list of messages"""
+    if len(messages) == 1:
+        return f"""Analyze sentiment of this message and return ONE word:
+{SENTIMENT_WORDS}.
+
+Message: "{messages[0]}"
 
 Return only the sentiment word."""
 
-            headers = {
-                "Authorization": f"Bearer {NVIDIA_API_KEY}",
-                "Content-Type": "application/json"
-            }
-            
-            payload = {
-                "model": "meta/llama-3.1-8b-instruct",
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": 0.5,
-                "max_tokens": 5
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(NVIDIA_API_URL, json=payload, headers=headers, timeout=2) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        sentiment = data['choices'][0]['message']['content'].strip().lower()
-                        if sentiment in doro_patterns:
-                            return sentiment
-    except:
-        pass
-    
-    # Fallback analysis
-    return analyze_simple(message)
+    numbered = "\n".join(f'{i}. "{message}"' for i, message in enumerate(messages, 1))
+    return f"""Analyze sentiment of each message below. For each one pick ONE word:
+{SENTIMENT_WORDS}.
+
+{numbered}
+
+Return one line per message in the form "<number>: <word>" and nothing else."""
+
+def parse_sentiments(content: str, count: int) -> List[Optional[str]]:
+    """Map the model reply back to per-message sentiments (None where missing or invalid)"""
+    if count == 1:
+        sentiment = content.strip().lower()
+        return [sentiment if sentiment in doro_patterns else None]
+
+    results: List[Optional[str]] = [None] * count
+    for number, sentiment in BATCH_LINE_RE.findall(content.lower()):
+        index = int(number) - 1
+        if 0 <= index < count and sentiment in doro_patterns:
+            results[index] = sentiment
+    return results
+
+async def classify_batch(messages: List[str], session: Optional[aiohttp.ClientSession] = None,
+                         url: str = NVIDIA_API_URL) -> List[Optional[str]]:
+    """Classify messages with one NVIDIA API request (raises on HTTP or transport errors)"""
+    headers = {
+        "Authorization": f"Bearer {NVIDIA_API_KEY}",
+        "Content-Type": "application/json"
+    }
+
+    payload = {
+        "model": "meta/llama-3.1-8b-instruct",
+        "messages": [{"role": "user", "content": build_sentiment_prompt(messages)}],
+        "temperature": 0.5,
+        "max_tokens": 5 if len(messages) == 1 else 8 * len(messages)
+    }
+
+    # Reuse pooled connections instead of a new session per call
+    if session is None:
+        session = await start_http_session()
+    async with session.post(url, json=payload, headers=headers) as resp:
+        resp.raise_for_status()
+        data = await resp.json()
+        return parse_sentiments(data['choices'][0]['message']['content'], len(messages))
+
+class CircuitBreaker:
+    """Stops calling an unhealthy upstream after repeated failed or slow calls
+
+    closed -> open after `failure_threshold` consecutive failures; open ->
+    half_open once `cooldown` has passed, letting a single probe through;
+    the probe closes the circuit on success or reopens it on failure.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown: float, slow_call: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.slow_call = slow_call
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.stats = {"calls": 0, "failures": 0, "slow_calls": 0, "rejected": 0}
+        self.transitions: Dict[str, int] = {}
+        self.recent_transitions = deque(maxlen=20)  # (unix time, from, to)
+        self.latencies = deque(maxlen=500)  # Seconds, most recent upstream calls
+
+    @property
+    def rejecting(self) -> bool:
+        """Whether a call made now would be refused (without claiming the half-open probe)"""
+        if self.state == "open":
+            return time.monotonic() - self.opened_at < self.cooldown
+        return self.state == "half_open" and self.probe_in_flight
+
+    def allow_request(self) -> bool:
+        """Claim permission for one upstream call"""
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+            self._transition("half_open")
+        if self.state == "closed":
+            return True
+        if self.state == "half_open" and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        self.stats["rejected"] += 1
+        return False
+
+    def record(self, ok: bool, latency: float):
+        """Record the outcome of a call granted by allow_request"""
+        self.stats["calls"] += 1
+        self.latencies.append(latency)
+        if ok and latency > self.slow_call:
+            self.stats["slow_calls"] += 1
+            ok = False
+        if not ok:
+            self.stats["failures"] += 1
+
+        was_probe, self.probe_in_flight = self.probe_in_flight, False
+        if ok:
+            self.consecutive_failures = 0
+            if self.state != "closed":
+                self._transition("closed")
+            return
+
+        self.consecutive_failures += 1
+        if was_probe or (self.state == "closed" and self.consecutive_failures >= self.failure_threshold):
+            self._transition("open")
+
+    def _transition(self, state: str):
+        previous, self.state = self.state, state
+        if state == "open":
+            self.opened_at = time.monotonic()
+        name = f"{previous}->{state}"
+        self.transitions[name] = self.transitions.get(name, 0) + 1
+        self.recent_transitions.append((time.time(), previous, state))
+        print(f"[INFO] Sentiment API circuit {name}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get breaker state, transition counts and upstream latency percentiles"""
+        return {
+            **self.stats,
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "transitions": dict(self.transitions),
+            "recent_transitions": list(self.recent_transitions),
+            "latency_ms": latency_percentiles(self.latencies)
+        }
+
+sentiment_breaker = CircuitBreaker(SENTIMENT_BREAKER_FAILURES, SENTIMENT_BREAKER_COOLDOWN, SENTIMENT_SLOW_CALL)
+
+async def classify_guarded(messages: List[str]) -> List[Optional[str]]:
+    """Classify through the circuit breaker within the latency budget (None where unavailable)"""
+    if not sentiment_breaker.allow_request():
+        return [None] * len(messages)
+
+    started = time.monotonic()
+    try:
+        results = await asyncio.wait_for(classify_batch(messages), SENTIMENT_LATENCY_BUDGET)
+        # A reply where nothing parsed is as useless as an error
+        ok = any(result is not None for result in results)
+    except asyncio.CancelledError:
+        sentiment_breaker.probe_in_flight = False
+        raise
+    except Exception:
+        results, ok = [None] * len(messages), False
+    sentiment_breaker.record(ok, time.monotonic() - started)
+    return results
+
+class SentimentBatcher:
+    """Collects sentiment lookups for a few milliseconds and classifies them in one request"""
+
+    def __init__(self, classify: Callable[[List[str]], Awaitable[List[Optional[str]]]],
+                 max_batch: int = SENTIMENT_BATCH_SIZE, window: float = SENTIMENT_BATCH_WINDOW):
+        self.classify = classify
+        self.max_batch = max_batch
+        self.window = window
+        self.stats = {"submitted": 0, "requests": 0, "largest_batch": 0}
+        self._pending: List[tuple] = []  # (message, future)
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, message: str) -> Optional[str]:
+        """Queue a message for the next batch and wait for its sentiment"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((message, future))
+        self.stats["submitted"] += 1
+
+        if len(self._pending) >= self.max_batch:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._dispatch)
+        return await future
+
+    def _dispatch(self):
+        """Send everything pending as one batch"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        # Keep a reference so the task is not garbage collected mid-request
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[tuple]):
+        """Classify one batch and fan the results back to the waiting callers"""
+        self.stats["requests"] += 1
+        self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+        try:
+            results = await self.classify([message for message, _ in batch])
+        except Exception:
+            results = []
+        for index, (_, future) in enumerate(batch):
+            # Callers that gave up (cancelled) no longer need a result
+            if not future.done():
+                future.set_result(results[index] if index < len(results) else None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get request counters and the average batch size"""
+        requests = self.stats["requests"]
+        return {
+            **self.stats,
+            "pending": len(self._pending),
+            "avg_batch": round((self.stats["submitted"] - len(self._pending)) / requests, 2) if requests else 0.0
+        }
+
+sentiment_batcher = SentimentBatcher(classify_guarded)
 
 def analyze_simple(message: str) -> str:
     """Simple keyword-based sentiment analysis"""
@@ -12,6 +12,10 @@ from database import DataManager
 from security import SecurityManager
 from doro_ai import analyze_simple, generate_doro_response
 from utils import log_security_event
+from log_resolver import log_channels
+from log_sink import log_sink
+from message_queue import message_queues
+from outbound import outbound, ENFORCEMENT, CHATTER
 from config import BOT_NAME
 
 # Global references
@@ -50,7 +54,16 @@ def setup_events(bot_instance: commands.Bot, dm: DataManager, sm: SecurityManage
                 print(f'[ERROR] Failed to sync commands: {e}')
         
         # Start presence update
-        update_presence.start()
+        if not update_presence.is_running():
+            update_presence.start()
+    
+    @bot.event
+    async def on_shard_ready(shard_id: int):
+        print(f"[INFO] Shard {shard_id} ready ({bot.shard_count} total)")
+    
+    @bot.event
+    async def on_shard_disconnect(shard_id: int):
+        print(f"[WARNING] Shard {shard_id} disconnected")
     
     @bot.event
     async def on_message(message):
@@ -65,34 +78,73 @@ def setup_events(bot_instance: commands.Bot, dm: DataManager, sm: SecurityManage
             if data_manager.is_dm_blocked(user_id):
                 return  # Ignore silently
             
-            # Track DM
-            from config import DM_SPAM_THRESHOLD, DM_SPAM_WINDOW
-            dm_history = data_manager.track_message("0", user_id, message.content)
+            # Track DM and count DMs in the spam window
+            from config import DM_SPAM_THRESHOLD
+            dm_count = data_manager.track_dm(user_id, message.content)
             
             # Check DM spam
-            from datetime import datetime, timedelta
-            now = datetime.now()
-            window_start = now - timedelta(seconds=DM_SPAM_WINDOW)
-            
-            dm_count = 0
-            for msg in dm_history:
-                msg_time = datetime.fromisoformat(msg["timestamp"])
-                if msg_time >= window_start:
-                    dm_count += 1
-            
             if dm_count >= DM_SPAM_THRESHOLD:
                 # Block user permanently
                 data_manager.block_dm_user(user_id, "DM Spam")
-                try:
-                    await message.author.send(
-                        "⛔ **You have been blocked from DMing Dorothy**\n"
-                        "Reason: Spam detected\n"
-                        "\"Chúng ta không thuộc về nhau\" 💔"
-                    )
-                except:
-                    pass
+                outbound.submit(CHATTER, f"dm:{message.author.id}", lambda: message.author.send(
+                    "⛔ **You have been blocked from DMing Dorothy**\n"
+                    "Reason: Spam detected\n"
+                    "\"Chúng ta không thuộc về nhau\" 💔"
+                ))
                 return
+            
+            await process_message(message)
+            return
+        
+        # Guild messages are handled by the fair per-guild worker pool; mention replies are cosmetic
+        cosmetic = bot.user in message.mentions and not message.mention_everyone
+        if not message_queues.submit(message.guild.id, process_message, message, cosmetic=cosmetic) and not cosmetic:
+            # Guild queue full: still track and check the message inline (mention replies and commands are skipped)
+            await check_guild_message(message)
+    
+    async def check_guild_message(message: discord.Message) -> bool:
+        """Track and check a guild message for spam and auto-mod; True if it was acted on
+        
+        Only the cheap tracking and checks run here. The response (deletes,
+        timeouts, DMs, logs) runs in the background so it never holds a
+        message worker or the guild's queue slot.
+        """
+        # Compute message features once for all checks
+        features = security_manager.extract_features(message)
         
+        # Check spam
+        spam_info = await security_manager.check_spam(message, features)
+        if spam_info:
+            security_manager.spawn(respond_to_spam(message, spam_info))
+            return True
+        
+        # Check auto-moderation
+        mod_info = await security_manager.check_auto_mod(message, features)
+        if mod_info:
+            security_manager.spawn(respond_to_auto_mod(message, mod_info))
+            return True
+        return False
+    
+    async def respond_to_spam(message: discord.Message, spam_info: dict):
+        await security_manager.handle_spam(message, spam_info)
+        await log_security_event(
+            message.guild,
+            "🚨 Spam Detected",
+            f"{message.author.mention} - {spam_info['reason']}",
+            discord.Color.orange()
+        )
+    
+    async def respond_to_auto_mod(message: discord.Message, mod_info: dict):
+        await security_manager.handle_auto_mod(message, mod_info)
+        await log_security_event(
+            message.guild,
+            "🤖 Auto-Mod Triggered",
+            f"{message.author.mention} - {mod_info['reason']}",
+            discord.Color.red() if mod_info['severity'] == 'high' else discord.Color.orange()
+        )
+    
+    async def process_message(message: discord.Message):
+        """Mention replies, security checks and commands for one message"""
         # Check if bot is mentioned
         if bot.user.mentioned_in(message) and not message.mention_everyone:
             if bot.user in message.mentions:
@@ -109,73 +161,48 @@ def setup_events(bot_instance: commands.Bot, dm: DataManager, sm: SecurityManage
                 sentiment = analyze_simple(content)
                 response = generate_doro_response(sentiment, include_action=False)
                 
-                await message.channel.send(response)
+                # Cosmetic: queued without holding a message worker
+                outbound.submit(CHATTER, f"send:{message.channel.id}", lambda: message.channel.send(response))
                 return
         
         # Security checks for guild messages
-        if message.guild:
-            # Check spam
-            spam_info = await security_manager.check_spam(message)
-            if spam_info:
-                await security_manager.handle_spam(message, spam_info)
-                await log_security_event(
-                    message.guild,
-                    "🚨 Spam Detected",
-                    f"{message.author.mention} - {spam_info['reason']}",
-                    discord.Color.orange()
-                )
-                return
-            
-            # Check auto-moderation
-            mod_info = await security_manager.check_auto_mod(message)
-            if mod_info:
-                await security_manager.handle_auto_mod(message, mod_info)
-                await log_security_event(
-                    message.guild,
-                    "🤖 Auto-Mod Triggered",
-                    f"{message.author.mention} - {mod_info['reason']}",
-                    discord.Color.red() if mod_info['severity'] == 'high' else discord.Color.orange()
-                )
-                return
+        if message.guild and await check_guild_message(message):
+            return
         
         # Check command spam before processing
-        if message.content.startswith(data_manager.get_prefix(message.guild.id) if message.guild else '-'):
-            from config import COMMAND_SPAM_THRESHOLD, COMMAND_SPAM_WINDOW
-            from datetime import datetime, timedelta
+        if message.content.startswith(data_manager.get_policy(message.guild.id).prefix if message.guild else '-'):
+            from config import COMMAND_SPAM_THRESHOLD
             
             user_id = str(message.author.id)
             command_name = message.content.split()[0] if message.content.split() else ""
             
-            # Track command
-            cmd_history = data_manager.track_command(user_id, command_name)
+            # Track command and count commands in the spam window
+            cmd_count = data_manager.track_command(user_id, command_name)
             
             # Check command spam
-            now = datetime.now()
-            window_start = now - timedelta(seconds=COMMAND_SPAM_WINDOW)
-            
-            cmd_count = 0
-            for cmd in cmd_history:
-                cmd_time = datetime.fromisoformat(cmd["timestamp"])
-                if cmd_time >= window_start:
-                    cmd_count += 1
-            
             if cmd_count >= COMMAND_SPAM_THRESHOLD:
                 # Mute 7 days for command spam (KHÔNG BLOCK, chỉ mute trong server)
                 if message.guild:
                     try:
                         from datetime import timedelta
                         mute_duration = timedelta(days=7)
-                        await message.author.timeout(mute_duration, reason="[AUTO] Command Spam")
-                        await message.channel.send(
-                            f"🚨 {message.author.mention} đã bị mute 7 ngày do spam commands!"
+                        await outbound.run(
+                            ENFORCEMENT, f"member:{message.guild.id}",
+                            lambda: message.author.timeout(mute_duration, reason="[AUTO] Command Spam")
                         )
+                        outbound.submit(CHATTER, f"send:{message.channel.id}", lambda: message.channel.send(
+                            f"🚨 {message.author.mention} đã bị mute 7 ngày do spam commands!"
+                        ))
                         data_manager.clear_command_tracking(user_id)
                     except:
                         pass
                 return
         
-        # Process commands
-        await bot.process_commands(message)
+        # Process commands (in their own task so slow commands don't hold a queue worker)
+        if message.guild:
+            security_manager.spawn(bot.process_commands(message))
+        else:
+            await bot.process_commands(message)
     
     @bot.event
     async def on_member_join(member: discord.Member):
@@ -194,96 +221,96 @@ def setup_events(bot_instance: commands.Bot, dm: DataManager, sm: SecurityManage
                 discord.Color.red()
             )
     
+    @bot.event
+    async def on_audit_log_entry_create(entry: discord.AuditLogEntry):
+        """Index audit log entries so nuke detection never has to query them"""
+        security_manager.audit_log.record(entry)
+    
+    @bot.event
+    async def on_guild_remove(guild: discord.Guild):
+        """Drop cached state of a guild the bot left"""
+        security_manager.audit_log.forget_guild(guild.id)
+        security_manager.roles.forget_guild(guild.id)
+        log_channels.invalidate(guild.id)
+        message_queues.forget_guild(guild.id)
+    
+    @bot.event
+    async def on_guild_channel_create(channel: discord.abc.GuildChannel):
+        log_channels.invalidate(channel.guild.id)
+    
+    @bot.event
+    async def on_guild_channel_update(before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+        if before.name != after.name:
+            log_channels.invalidate(after.guild.id)
+    
+    @bot.event
+    async def on_guild_role_create(role: discord.Role):
+        security_manager.roles.role_updated(role)
+    
+    @bot.event
+    async def on_guild_role_update(before: discord.Role, after: discord.Role):
+        security_manager.roles.role_updated(after)
+    
+    @bot.event
+    async def on_member_update(before: discord.Member, after: discord.Member):
+        if before.roles != after.roles:
+            security_manager.roles.member_roles_changed(before, after)
+    
+    async def check_nuke_event(guild: discord.Guild, action: discord.AuditLogAction, target_id: int,
+                               action_type: str, description: str):
+        """Resolve who performed an action and contain them if it is part of a nuke"""
+        moderator = await security_manager.resolve_moderator(guild, action, target_id)
+        if moderator is None:
+            return
+        
+        # Check for nuke attempt
+        is_nuke = await security_manager.check_nuke_action(guild, moderator, action_type)
+        
+        if is_nuke:
+            await security_manager.handle_nuke_attempt(guild, moderator, action_type)
+            await log_security_event(
+                guild,
+                "🚨 NUKE ATTEMPT BLOCKED",
+                f"{moderator.mention} {description}",
+                discord.Color.dark_red()
+            )
+    
     @bot.event
     async def on_member_ban(guild: discord.Guild, user: discord.User):
         """Monitor bans for nuke detection"""
-        # Get ban entry to find who banned
         try:
-            async for entry in guild.audit_logs(limit=1, action=discord.AuditLogAction.ban):
-                if entry.target.id == user.id:
-                    moderator = entry.user
-                    
-                    # Check for nuke attempt
-                    is_nuke = await security_manager.check_nuke_action(guild, moderator, "ban")
-                    
-                    if is_nuke:
-                        await security_manager.handle_nuke_attempt(guild, moderator, "ban")
-                        await log_security_event(
-                            guild,
-                            "🚨 NUKE ATTEMPT BLOCKED",
-                            f"{moderator.mention} attempted mass bans!",
-                            discord.Color.dark_red()
-                        )
-                    break
+            await check_nuke_event(guild, discord.AuditLogAction.ban, user.id, "ban", "attempted mass bans!")
         except:
             pass
     
     @bot.event
     async def on_member_remove(member: discord.Member):
         """Monitor kicks for nuke detection"""
+        security_manager.roles.member_removed(member)
         try:
-            async for entry in member.guild.audit_logs(limit=1, action=discord.AuditLogAction.kick):
-                if entry.target.id == member.id:
-                    moderator = entry.user
-                    
-                    # Check for nuke attempt
-                    is_nuke = await security_manager.check_nuke_action(member.guild, moderator, "kick")
-                    
-                    if is_nuke:
-                        await security_manager.handle_nuke_attempt(member.guild, moderator, "kick")
-                        await log_security_event(
-                            member.guild,
-                            "🚨 NUKE ATTEMPT BLOCKED",
-                            f"{moderator.mention} attempted mass kicks!",
-                            discord.Color.dark_red()
-                        )
-                    break
+            # Ordinary leaves have no kick entry: the lookup just times out without an API call
+            await check_nuke_event(member.guild, discord.AuditLogAction.kick, member.id, "kick", "attempted mass kicks!")
         except:
             pass
     
     @bot.event
     async def on_guild_channel_delete(channel: discord.abc.GuildChannel):
         """Monitor channel deletions for nuke detection"""
+        log_channels.invalidate(channel.guild.id)
+        log_sink.forget_channel(channel.id)
         try:
-            async for entry in channel.guild.audit_logs(limit=1, action=discord.AuditLogAction.channel_delete):
-                if entry.target.id == channel.id:
-                    moderator = entry.user
-                    
-                    # Check for nuke attempt
-                    is_nuke = await security_manager.check_nuke_action(channel.guild, moderator, "channel_delete")
-                    
-                    if is_nuke:
-                        await security_manager.handle_nuke_attempt(channel.guild, moderator, "channel_delete")
-                        await log_security_event(
-                            channel.guild,
-                            "🚨 NUKE ATTEMPT BLOCKED",
-                            f"{moderator.mention} attempted mass channel deletion!",
-                            discord.Color.dark_red()
-                        )
-                    break
+            await check_nuke_event(channel.guild, discord.AuditLogAction.channel_delete, channel.id,
+                                   "channel_delete", "attempted mass channel deletion!")
         except:
             pass
     
     @bot.event
     async def on_guild_role_delete(role: discord.Role):
         """Monitor role deletions for nuke detection"""
+        security_manager.roles.role_deleted(role)
         try:
-            async for entry in role.guild.audit_logs(limit=1, action=discord.AuditLogAction.role_delete):
-                if entry.target.id == role.id:
-                    moderator = entry.user
-                    
-                    # Check for nuke attempt
-                    is_nuke = await security_manager.check_nuke_action(role.guild, moderator, "role_delete")
-                    
-                    if is_nuke:
-                        await security_manager.handle_nuke_attempt(role.guild, moderator, "role_delete")
-                        await log_security_event(
-                            role.guild,
-                            "🚨 NUKE ATTEMPT BLOCKED",
-                            f"{moderator.mention} attempted mass role deletion!",
-                            discord.Color.dark_red()
-                        )
-                    break
+            await check_nuke_event(role.guild, discord.AuditLogAction.role_delete, role.id,
+                                   "role_delete", "attempted mass role deletion!")
         except:
             pass
     
@@ -306,41 +333,47 @@ def setup_events(bot_instance: commands.Bot, dm: DataManager, sm: SecurityManage
     
     @tasks.loop(seconds=30)
     async def update_presence():
-        """Update bot presence with server count"""
-        activity = discord.Activity(
-            type=discord.ActivityType.watching,
-            name=f"{len(bot.guilds)} servers",
-            state="Protecting..."
-        )
-        await bot.change_presence(
-            status=discord.Status.do_not_disturb,
-            activity=activity
-        )
+        """Update each shard's presence with its server count and latency"""
+        guild_counts = {}
+        for guild in bot.guilds:
+            guild_counts[guild.shard_id] = guild_counts.get(guild.shard_id, 0) + 1
+        
+        for shard_id, shard in bot.shards.items():
+            if shard.is_closed():
+                continue
+            latency = round(shard.latency * 1000) if shard.latency == shard.latency else 0  # NaN before first heartbeat
+            activity = discord.Activity(
+                type=discord.ActivityType.watching,
+                name=f"{len(bot.guilds)} servers",
+                state=f"Protecting... | Shard {shard_id} · {guild_counts.get(shard_id, 0)} servers · {latency}ms"
+            )
+            await bot.change_presence(
+                status=discord.Status.do_not_disturb,
+                activity=activity,
+                shard_id=shard_id
+            )
     
     # Command spam check decorator for slash commands
     async def check_slash_spam(interaction: discord.Interaction) -> bool:
         """Check if user is spamming slash commands"""
-        from config import COMMAND_SPAM_THRESHOLD, COMMAND_SPAM_WINDOW
-        from datetime import datetime, timedelta
+        from config import COMMAND_SPAM_THRESHOLD
+        from datetime import timedelta
         
         user_id = str(interaction.user.id)
         command_name = f"/{interaction.command.name}"
         
-        # Track command
-        cmd_history = data_manager.track_command(user_id, command_name)
-        
-        # Check command spam
-        now = datetime.now()
-        window_start = now - timedelta(seconds=COMMAND_SPAM_WINDOW)
-        
-        cmd_count = sum(1 for cmd in cmd_history if datetime.fromisoformat(cmd["timestamp"]) >= window_start)
+        # Track command and count commands in the spam window
+        cmd_count = data_manager.track_command(user_id, command_name)
         
         if cmd_count >= COMMAND_SPAM_THRESHOLD:
             # Mute 7 days for slash command spam (KHÔNG BLOCK, chỉ mute trong server)
             if interaction.guild:
                 try:
                     mute_duration = timedelta(days=7)
-                    await interaction.user.timeout(mute_duration, reason="[AUTO] Slash Command Spam")
+                    await outbound.run(
+                        ENFORCEMENT, f"member:{interaction.guild.id}",
+                        lambda: interaction.user.timeout(mute_duration, reason="[AUTO] Slash Command Spam")
+                    )
                     await interaction.response.send_message(
                         f"🚨 Bạn đã bị mute 7 ngày do spam commands!",
                         ephemeral=True
@@ -82,7 +82,7 @@ def setup_commands(bot: commands.Bot):
         if ctx.author.id not in OWNER_IDS:
             return await ctx.send("❌ This command is owner-only!")
         
-        blocked_users = data_manager.data.get("dm_blocked_users", {})
+        blocked_users = data_manager.get_dm_blocked_users()
         
         if not blocked_users:
             return await ctx.send("✅ No users are currently blocked from DMing the bot!")
@@ -185,12 +185,19 @@ def setup_commands(bot: commands.Bot):
         from localization import get_text
         guild_id = str(ctx.guild.id) if ctx.guild else "0"
         
-        latency = round(bot.latency * 1000)
+        # Latency of the shard serving this server (DMs arrive on shard 0)
+        shard_id = ctx.guild.shard_id if ctx.guild else 0
+        latencies = {sid: round(value * 1000) if value == value else 0 for sid, value in bot.latencies}  # NaN before first heartbeat
+        latency = latencies.get(shard_id, round(bot.latency * 1000))
         embed = discord.Embed(
             title=get_text(guild_id, "ping_title"),
             description=get_text(guild_id, "ping_latency", ms=latency),
             color=discord.Color.green() if latency < 100 else discord.Color.orange()
         )
+        embed.set_footer(text=get_text(guild_id, "ping_shard", shard=shard_id, count=bot.shard_count or 1))
+        if len(latencies) > 1:
+            lines = [f"`{sid}` {ms}ms" for sid, ms in sorted(latencies.items())]
+            embed.add_field(name=get_text(guild_id, "ping_shards"), value="\n".join(lines[:25])[:1024], inline=False)
         await ctx.send(embed=embed)
 
     @bot.command(name='setprefix', aliases=['prefix'])
@@ -0,0 +1,250 @@
+"""
+Dorothy Bot - Journal Database Module
+Append-only operation log with periodic snapshot compaction
+"""
+
+import asyncio
+import json
+import os
+from typing import Dict, List, Optional, Any
+from database import DataManager
+
+def apply_op(data: Dict, op: Dict):
+    """Apply one journal operation to the data dict"""
+    *parents, key = op["path"]
+    target = data
+    for part in parents:
+        target = target.setdefault(part, {})
+
+    kind = op["op"]
+    if kind == "set":
+        target[key] = op["value"]
+    elif kind == "del":
+        target.pop(key, None)
+    elif kind == "append":
+        items = target.setdefault(key, [])
+        items.append(op["value"])
+        if op.get("keep"):
+            del items[:-op["keep"]]
+
+def read_journal(path: str) -> List[Dict]:
+    """Read journal operations, stopping at the first torn or corrupt record"""
+    ops = []
+    if not os.path.exists(path):
+        return ops
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            # A record without its trailing newline was cut off mid-write
+            if not line.endswith("\n"):
+                break
+            try:
+                ops.append(json.loads(line))
+            except ValueError:
+                break
+    return ops
+
+class JournalDataManager(DataManager):
+    """DataManager that appends each mutation to a journal and folds it into the JSON snapshot periodically"""
+
+    def __init__(self, filename="dorothy_data.json", journal_filename: Optional[str] = None, compact_ops: int = 1000):
+        self.journal_filename = journal_filename or os.path.splitext(filename)[0] + ".journal"
+        self.compact_ops = compact_ops
+        self._seq = 0
+        self._journal_lines: List[tuple] = []  # (seq, line) written since the last snapshot
+        self._journal = None
+        super().__init__(filename)
+        self._open_journal()
+
+    # ==================== SNAPSHOT + REPLAY ====================
+    def load_data(self) -> Dict:
+        """Load the snapshot, then replay journal operations newer than it"""
+        data = super().load_data()
+        self._seq = data.pop("_journal_seq", 0)
+
+        for op in read_journal(self.journal_filename):
+            if op["seq"] <= self._seq:
+                continue
+            apply_op(data, op)
+            self._seq = op["seq"]
+            self._journal_lines.append((op["seq"], json.dumps(op, ensure_ascii=False) + "\n"))
+        return data
+
+    def _open_journal(self):
+        """Rewrite the journal with only valid tail records and open it for appending"""
+        self._rewrite_journal()
+        self._journal = open(self.journal_filename, 'a', encoding='utf-8')
+
+    def _rewrite_journal(self):
+        """Atomically replace the journal with the records not yet in the snapshot"""
+        tmp_path = self.journal_filename + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(line for _, line in self._journal_lines)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_filename)
+
+    def _append_op(self, name: str, op: str, path: List[str], value: Any = None, keep: int = 0):
+        """Append one operation record to the journal"""
+        self._seq += 1
+        record = {"seq": self._seq, "name": name, "op": op, "path": path}
+        if op != "del":
+            record["value"] = value
+        if keep:
+            record["keep"] = keep
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        self._journal_lines.append((self._seq, line))
+        try:
+            self._journal.write(line)
+            self._journal.flush()
+        except Exception as e:
+            print(f"Error writing journal: {e}")
+
+        # Fold the log into a snapshot once it grows past the threshold
+        if len(self._journal_lines) >= self.compact_ops and self._flush_task is None:
+            self.flush()
+
+    def _set_op(self, name: str, path: List[str]):
+        """Journal the current value at path (or its deletion if it no longer exists)"""
+        target = self.data
+        for part in path[:-1]:
+            target = target.get(part, {})
+        if path[-1] in target:
+            self._append_op(name, "set", path, target[path[-1]])
+        else:
+            self._append_op(name, "del", path)
+
+    # ==================== COMPACTION ====================
+    def save_data(self):
+        """No full rewrite: mutations are journaled individually"""
+        self.write_stats["save_requests"] += 1
+
+    def _snapshot(self) -> tuple:
+        """Serialize data together with the journal position it covers"""
+        snapshot = dict(self.data)
+        snapshot["_journal_seq"] = self._seq
+        return self._seq, json.dumps(snapshot, ensure_ascii=False, indent=2)
+
+    def _truncate_journal(self, seq: int):
+        """Drop journal records already folded into the snapshot"""
+        self._journal_lines = [(s, line) for s, line in self._journal_lines if s > seq]
+        self._journal.close()
+        self._open_journal()
+
+    def flush(self):
+        """Compact the journal into the snapshot immediately"""
+        if not self._journal_lines and os.path.exists(self.filename):
+            return
+        seq, payload = self._snapshot()
+        try:
+            self._write_file(payload)
+            self._truncate_journal(seq)
+        except Exception as e:
+            print(f"Error compacting journal: {e}")
+
+    async def flush_async(self):
+        """Compact once the journal passes the threshold, writing the snapshot off the event loop"""
+        if len(self._journal_lines) < self.compact_ops:
+            return
+        await self.compact_async()
+
+    async def compact_async(self):
+        """Write the snapshot from a worker thread, then drop the folded records"""
+        seq, payload = self._snapshot()
+        try:
+            await asyncio.to_thread(self._write_file, payload)
+            # Records appended while the snapshot was written stay in the journal
+            self._truncate_journal(seq)
+        except Exception as e:
+            print(f"Error compacting journal: {e}")
+
+    async def close(self):
+        """Stop the compaction task and fold the whole journal into the snapshot"""
+        task, self._flush_task = self._flush_task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self._journal_lines:
+            await self.compact_async()
+
+    # ==================== JOURNALED MUTATIONS ====================
+    def add_warning(self, guild_id: str, user_id: str, reason: str = "") -> int:
+        count = super().add_warning(guild_id, user_id, reason)
+        guild_id, user_id = str(guild_id), str(user_id)
+        self._append_op("add_warning", "append", ["warnings", guild_id, user_id],
+                        self.data["warnings"][guild_id][user_id][-1])
+        return count
+
+    def clear_warnings(self, guild_id: str, user_id: str) -> bool:
+        cleared = super().clear_warnings(guild_id, user_id)
+        if cleared:
+            self._append_op("clear_warnings", "del", ["warnings", str(guild_id), str(user_id)])
+        return cleared
+
+    def set_prefix(self, guild_id: str, prefix: str):
+        super().set_prefix(guild_id, prefix)
+        self._set_op("set_prefix", ["prefixes", str(guild_id)])
+
+    def set_security_setting(self, guild_id: str, setting: str, enabled: bool):
+        super().set_security_setting(guild_id, setting, enabled)
+        self._set_op("set_security_setting", ["security", setting, str(guild_id)])
+
+    def add_whitelist(self, guild_id: str, user_id: str):
+        super().add_whitelist(guild_id, user_id)
+        self._set_op("add_whitelist", ["security", "whitelisted_users", str(guild_id)])
+
+    def remove_whitelist(self, guild_id: str, user_id: str):
+        super().remove_whitelist(guild_id, user_id)
+        self._set_op("remove_whitelist", ["security", "whitelisted_users", str(guild_id)])
+
+    def add_whitelist_channel(self, guild_id: str, channel_id: str):
+        super().add_whitelist_channel(guild_id, channel_id)
+        self._set_op("add_whitelist_channel", ["security", "whitelisted_channels", str(guild_id)])
+
+    def remove_whitelist_channel(self, guild_id: str, channel_id: str):
+        super().remove_whitelist_channel(guild_id, channel_id)
+        self._set_op("remove_whitelist_channel", ["security", "whitelisted_channels", str(guild_id)])
+
+    def add_blacklist_word(self, guild_id: str, word: str):
+        super().add_blacklist_word(guild_id, word)
+        self._set_op("add_blacklist_word", ["security", "blacklisted_words", str(guild_id)])
+
+    def remove_blacklist_word(self, guild_id: str, word: str):
+        super().remove_blacklist_word(guild_id, word)
+        self._set_op("remove_blacklist_word", ["security", "blacklisted_words", str(guild_id)])
+
+    def add_blocked_domain(self, guild_id: str, domain: str):
+        super().add_blocked_domain(guild_id, domain)
+        self._set_op("add_blocked_domain", ["security", "blocked_link_domains", str(guild_id)])
+
+    def remove_blocked_domain(self, guild_id: str, domain: str):
+        super().remove_blocked_domain(guild_id, domain)
+        self._set_op("remove_blocked_domain", ["security", "blocked_link_domains", str(guild_id)])
+
+    def add_security_log(self, guild_id: str, log_type: str, details: Dict):
+        super().add_security_log(guild_id, log_type, details)
+        guild_id = str(guild_id)
+        self._append_op("add_security_log", "append", ["security", "security_logs", guild_id],
+                        self.data["security"]["security_logs"][guild_id][-1], keep=100)
+
+    def set_language(self, guild_id: str, language: str):
+        super().set_language(guild_id, language)
+        self._set_op("set_language", ["languages", str(guild_id)])
+
+    def block_dm_user(self, user_id: str, reason: str = "DM Spam"):
+        super().block_dm_user(user_id, reason)
+        self._set_op("block_dm_user", ["dm_blocked_users", str(user_id)])
+
+    def unblock_dm_user(self, user_id: str):
+        super().unblock_dm_user(user_id)
+        self._set_op("unblock_dm_user", ["dm_blocked_users", str(user_id)])
+
+    def set_log_channel(self, guild_id: str, channel_id: int):
+        super().set_log_channel(guild_id, channel_id)
+        self._set_op("set_log_channel", ["log_channels", str(guild_id)])
+
+    def remove_log_channel(self, guild_id: str):
+        super().remove_log_channel(guild_id)
+        self._set_op("remove_log_channel", ["log_channels", str(guild_id)])
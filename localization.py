@@ -85,7 +85,7 @@ TRANSLATIONS = {
         "help_kickban": "🔨 **Kick/Ban**",
         "help_kickban_desc": "`-kick @user [reason]` - Kick member\n`-ban @user [reason]` - Ban member\n`-unban <user_id>` - Unban member",
         "help_security": "🛡️ **Security**",
-        "help_security_desc": "`-security` - View security status\n`-antinuke [on/off]` - Anti-nuke protection\n`-antiraid [on/off]` - Anti-raid protection\n`-antispam [on/off]` - Anti-spam protection\n`-automod [on/off]` - Auto-moderation\n`-whitelist @user` - Add user to whitelist\n`-whitelistchannel [#channel]` - Add channel to whitelist (immune zone)\n`-blacklist [add/remove] <word>` - Manage blacklist",
+        "help_security_desc": "`-security` - View security status\n`-antinuke [on/off]` - Anti-nuke protection\n`-antiraid [on/off]` - Anti-raid protection\n`-antispam [on/off]` - Anti-spam protection\n`-automod [on/off]` - Auto-moderation\n`-whitelist @user` - Add user to whitelist\n`-whitelistchannel [#channel]` - Add channel to whitelist (immune zone)\n`-blacklist [add/remove] <word>` - Manage blacklist\n`-blocklink [add/remove] <domain>` - Block links to a domain",
         "help_utility": "🛠️ **Utility**",
         "help_utility_desc": "`-clear [amount]` - Delete messages\n`-lock [#channel]` - Lock channel\n`-unlock [#channel]` - Unlock channel\n`-slowmode [seconds]` - Set slowmode",
         "help_info": "📊 **Information**",
@@ -118,6 +118,8 @@ TRANSLATIONS = {
         # Ping
         "ping_title": "🏓 Pong!",
         "ping_latency": "Latency: **{ms}ms**",
+        "ping_shard": "Shard {shard} of {count}",
+        "ping_shards": "Shard latencies",
         
         # Prefix
         "prefix_current": "📌 Current prefix: `{prefix}`\nUse: `{prefix}setprefix <prefix>` to change",
@@ -165,6 +167,11 @@ TRANSLATIONS = {
         "blacklist_usage": "❌ Use: `-blacklist add/remove <word>`",
         "blacklist_added": "✅ Added word `{word}` to blacklist!",
         "blacklist_removed": "✅ Removed word `{word}` from blacklist!",
+        "blocklink_title": "🔗 Blocked Link Domains",
+        "blocklink_empty": "ℹ️ No blocked link domains yet! (Discord invites are always blocked)",
+        "blocklink_usage": "❌ Use: `-blocklink add/remove <domain>`",
+        "blocklink_added": "✅ Links to `{domain}` will now be removed!",
+        "blocklink_removed": "✅ Links to `{domain}` are allowed again!",
         
         # DM notifications
         "dm_title": "⚠️ Violation Notice",
@@ -283,7 +290,7 @@ TRANSLATIONS = {
         "help_kickban": "🔨 **Kick/Ban**",
         "help_kickban_desc": "`-kick @user [lý do]` - Kick thành viên\n`-ban @user [lý do]` - Ban thành viên\n`-unban <user_id>` - Unban thành viên",
         "help_security": "🛡️ **Bảo mật**",
-        "help_security_desc": "`-security` - Xem trạng thái bảo mật\n`-antinuke [on/off]` - Chống nuke\n`-antiraid [on/off]` - Chống raid\n`-antispam [on/off]` - Chống spam\n`-automod [on/off]` - Tự động kiểm duyệt\n`-whitelist @user` - Thêm user vào whitelist\n`-whitelistchannel [#kênh]` - Thêm kênh vào whitelist (vùng miễn nhiễm)\n`-blacklist [add/remove] <từ>` - Quản lý blacklist",
+        "help_security_desc": "`-security` - Xem trạng thái bảo mật\n`-antinuke [on/off]` - Chống nuke\n`-antiraid [on/off]` - Chống raid\n`-antispam [on/off]` - Chống spam\n`-automod [on/off]` - Tự động kiểm duyệt\n`-whitelist @user` - Thêm user vào whitelist\n`-whitelistchannel [#kênh]` - Thêm kênh vào whitelist (vùng miễn nhiễm)\n`-blacklist [add/remove] <từ>` - Quản lý blacklist\n`-blocklink [add/remove] <tên miền>` - Chặn link tới tên miền",
         "help_utility": "🛠️ **Tiện ích**",
         "help_utility_desc": "`-clear [số]` - Xóa tin nhắn\n`-lock [#kênh]` - Khóa kênh\n`-unlock [#kênh]` - Mở khóa kênh\n`-slowmode [giây]` - Đặt slowmode",
         "help_info": "📊 **Thông tin**",
@@ -316,6 +323,8 @@ TRANSLATIONS = {
         # Ping
         "ping_title": "🏓 Pong!",
         "ping_latency": "Độ trễ: **{ms}ms**",
+        "ping_shard": "Shard {shard} / {count}",
+        "ping_shards": "Độ trễ các shard",
         
         # Prefix
         "prefix_current": "📌 Prefix hiện tại: `{prefix}`\nSử dụng: `{prefix}setprefix <prefix>` để thay đổi",
@@ -363,6 +372,11 @@ TRANSLATIONS = {
         "blacklist_usage": "❌ Sử dụng: `-blacklist add/remove <từ>`",
         "blacklist_added": "✅ Đã thêm từ `{word}` vào blacklist!",
         "blacklist_removed": "✅ Đã xóa từ `{word}` khỏi blacklist!",
+        "blocklink_title": "🔗 Danh sách tên miền bị chặn",
+        "blocklink_empty": "ℹ️ Chưa có tên miền nào bị chặn! (Link mời Discord luôn bị chặn)",
+        "blocklink_usage": "❌ Sử dụng: `-blocklink add/remove <tên miền>`",
+        "blocklink_added": "✅ Link tới `{domain}` sẽ bị xóa!",
+        "blocklink_removed": "✅ Link tới `{domain}` đã được cho phép lại!",
         
         # DM notifications
         "dm_title": "⚠️ Thông Báo Vi Phạm",
@@ -406,11 +420,11 @@ TRANSLATIONS = {
 
 def get_text(guild_id: str, key: str, **kwargs) -> str:
     """Get translated text for a guild"""
-    from database import DataManager
+    from database import get_data_manager
     
-    # Get data manager instance
-    dm = DataManager()
-    language = dm.get_language(guild_id)
+    # Get shared data manager instance
+    dm = get_data_manager()
+    language = dm.get_policy(guild_id).language
     
     # Get translation
     if language in TRANSLATIONS and key in TRANSLATIONS[language]:
@@ -0,0 +1,65 @@
+"""
+Dorothy Bot - Log Channel Resolver Module
+Cached lookup of the channels that receive moderation and security logs
+"""
+
+from typing import Dict, Optional
+import discord
+from database import get_data_manager
+
+# Channel names searched for each kind of log, most specific first
+LOG_CHANNEL_NAMES = {
+    "log": ("log",),
+    "mod-log": ("mod-log", "log"),
+    "security-log": ("security-log", "log"),
+}
+
+class LogChannelResolver:
+    """Per-guild cache of log channels by name
+
+    The channel set with /logchannel always wins. Otherwise the first text
+    channel named after the log kind is used. The name map is built with
+    one scan of the guild's channels and dropped whenever a channel is
+    created, renamed or deleted.
+    """
+
+    def __init__(self):
+        self._by_name: Dict[int, Dict[str, int]] = {}  # guild -> channel name -> channel id
+        self.stats = {"scans": 0, "invalidations": 0}
+
+    def _names(self, guild: discord.Guild) -> Dict[str, int]:
+        names = self._by_name.get(guild.id)
+        if names is None:
+            self.stats["scans"] += 1
+            wanted = {name for candidates in LOG_CHANNEL_NAMES.values() for name in candidates}
+            names = {}
+            for channel in guild.text_channels:
+                if channel.name in wanted and channel.name not in names:
+                    names[channel.name] = channel.id
+            self._by_name[guild.id] = names
+        return names
+
+    def resolve(self, guild: discord.Guild, kind: str) -> Optional[discord.TextChannel]:
+        """Get the channel for "log", "mod-log" or "security-log" messages"""
+        configured = get_data_manager().get_policy(guild.id).log_channel
+        if configured:
+            channel = guild.get_channel(configured)
+            if channel is not None:
+                return channel
+
+        names = self._names(guild)
+        for name in LOG_CHANNEL_NAMES[kind]:
+            channel_id = names.get(name)
+            if channel_id is not None:
+                channel = guild.get_channel(channel_id)
+                if channel is not None:
+                    return channel
+        return None
+
+    def invalidate(self, guild_id: int):
+        """Forget the name map of a guild after its channels changed"""
+        if self._by_name.pop(guild_id, None) is not None:
+            self.stats["invalidations"] += 1
+
+# Shared resolver used by every log and alert sender
+log_channels = LogChannelResolver()
@@ -0,0 +1,168 @@
+"""
+Dorothy Bot - Log Sink Module
+Batched delivery of log embeds to log channels
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import discord
+from config import LOG_BATCH_WINDOW, LOG_BATCH_MAX, LOG_SUMMARY_THRESHOLD, LOG_USE_WEBHOOKS
+from outbound import outbound, LOGGING
+
+EMBEDS_PER_MESSAGE = 10  # Discord limit
+EMBED_CHARS_PER_MESSAGE = 6000  # Discord limit on the combined size of a message's embeds
+WEBHOOK_NAME = "Dorothy Logs"
+
+class LogSink:
+    """Buffers log embeds per channel and sends them in as few messages as possible
+
+    Embeds posted to a channel within `window` seconds go out together, up
+    to ten per message. When one kind of event (same title) repeats at
+    least `summary_threshold` times in a window, those embeds collapse
+    into one summary embed. Urgent posts flush the channel immediately.
+    With webhooks enabled, messages go through a channel webhook, which has
+    its own rate limit bucket, falling back to the channel itself.
+    """
+
+    def __init__(self, window: float, max_buffered: int, summary_threshold: int, use_webhooks: bool = False):
+        self.window = window
+        self.max_buffered = max_buffered
+        self.summary_threshold = summary_threshold
+        self.use_webhooks = use_webhooks
+        self.stats = {"buffered": 0, "summarized": 0, "dropped": 0, "sent_messages": 0, "sent_embeds": 0, "failed": 0}
+        self._buffers: Dict[int, List[discord.Embed]] = {}
+        self._channels: Dict[int, discord.abc.Messageable] = {}
+        self._timers: Dict[int, asyncio.TimerHandle] = {}
+        self._webhooks: Dict[int, Optional[discord.Webhook]] = {}  # None = webhooks unavailable there
+        self._tasks = set()
+
+    def post(self, channel: discord.abc.Messageable, embed: discord.Embed, urgent: bool = False):
+        """Queue an embed for channel (never waits on Discord)"""
+        buffer = self._buffers.setdefault(channel.id, [])
+        if len(buffer) >= self.max_buffered:
+            self.stats["dropped"] += 1
+            return
+        buffer.append(embed)
+        self._channels[channel.id] = channel
+        self.stats["buffered"] += 1
+
+        if urgent:
+            self._schedule_flush(channel.id)
+        elif channel.id not in self._timers:
+            self._timers[channel.id] = asyncio.get_running_loop().call_later(
+                self.window, self._schedule_flush, channel.id
+            )
+
+    def _schedule_flush(self, channel_id: int):
+        timer = self._timers.pop(channel_id, None)
+        if timer is not None:
+            timer.cancel()
+        embeds = self._buffers.pop(channel_id, None)
+        channel = self._channels.pop(channel_id, None)
+        if not embeds or channel is None:
+            return
+        task = asyncio.get_running_loop().create_task(self._send(channel, embeds))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def summarize(self, embeds: List[discord.Embed]) -> List[discord.Embed]:
+        """Collapse repeated kinds of events into summary embeds (order of first occurrence kept)"""
+        groups: Dict[Any, List[discord.Embed]] = {}
+        for embed in embeds:
+            groups.setdefault(embed.title, []).append(embed)
+
+        result = []
+        for title, group in groups.items():
+            if len(group) < self.summary_threshold:
+                result.extend(group)
+                continue
+            self.stats["summarized"] += len(group)
+            lines = [(embed.description or "").split("\n")[0][:120] for embed in group[:10]]
+            if len(group) > 10:
+                lines.append(f"…and {len(group) - 10} more")
+            summary = discord.Embed(
+                title=f"{title} ×{len(group)}",
+                description=f"**{len(group)} events in the last {self.window:g}s**\n" + "\n".join(lines),
+                color=group[0].color,
+                timestamp=datetime.now()
+            )
+            summary.set_footer(text="Dorothy Security System")
+            result.append(summary)
+        return result
+
+    def chunk(self, embeds: List[discord.Embed]) -> List[List[discord.Embed]]:
+        """Split embeds into messages within Discord's embed count and total size limits"""
+        chunks, current, size = [], [], 0
+        for embed in embeds:
+            length = len(embed)
+            if current and (len(current) >= EMBEDS_PER_MESSAGE or size + length > EMBED_CHARS_PER_MESSAGE):
+                chunks.append(current)
+                current, size = [], 0
+            current.append(embed)
+            size += length
+        if current:
+            chunks.append(current)
+        return chunks
+
+    async def _send(self, channel: discord.abc.Messageable, embeds: List[discord.Embed]):
+        embeds = self.summarize(embeds)
+        webhook = await self._get_webhook(channel)
+        for chunk in self.chunk(embeds):
+            try:
+                if webhook is not None:
+                    try:
+                        await outbound.run(LOGGING, f"webhook:{webhook.id}", lambda: webhook.send(embeds=chunk))
+                    except (discord.NotFound, discord.Forbidden):
+                        # Webhook deleted or revoked: use the channel from now on
+                        self._webhooks[channel.id] = webhook = None
+                        await outbound.run(LOGGING, f"send:{channel.id}", lambda: channel.send(embeds=chunk))
+                else:
+                    await outbound.run(LOGGING, f"send:{channel.id}", lambda: channel.send(embeds=chunk))
+                self.stats["sent_messages"] += 1
+                self.stats["sent_embeds"] += len(chunk)
+            except Exception:
+                self.stats["failed"] += len(chunk)
+
+    async def _get_webhook(self, channel: discord.abc.Messageable) -> Optional[discord.Webhook]:
+        """Find or create this bot's log webhook in channel (cached; None if not allowed)"""
+        if not self.use_webhooks or not isinstance(channel, discord.TextChannel):
+            return None
+        if channel.id in self._webhooks:
+            return self._webhooks[channel.id]
+        webhook = None
+        try:
+            me = channel.guild.me
+            for existing in await channel.webhooks():
+                if existing.name == WEBHOOK_NAME and existing.user is not None and existing.user.id == me.id:
+                    webhook = existing
+                    break
+            if webhook is None:
+                webhook = await channel.create_webhook(name=WEBHOOK_NAME, reason="Batched security logs")
+        except Exception:
+            webhook = None  # Missing Manage Webhooks permission
+        self._webhooks[channel.id] = webhook
+        return webhook
+
+    def forget_channel(self, channel_id: int):
+        """Drop the cached webhook of a deleted channel"""
+        self._webhooks.pop(channel_id, None)
+
+    async def close(self):
+        """Send everything still buffered"""
+        for channel_id in list(self._buffers):
+            self._schedule_flush(channel_id)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get buffered/sent/dropped counters"""
+        return {
+            **self.stats,
+            "pending": sum(len(buffer) for buffer in self._buffers.values()),
+            "channels_pending": len(self._buffers),
+            "webhooks": sum(1 for webhook in self._webhooks.values() if webhook is not None)
+        }
+
+# Shared sink used by every log and alert sender
+log_sink = LogSink(LOG_BATCH_WINDOW, LOG_BATCH_MAX, LOG_SUMMARY_THRESHOLD, LOG_USE_WEBHOOKS)
@@ -40,9 +40,13 @@ from dotenv import load_dotenv
 
 # Import modules
 import config
-from config import PREFIX, OWNER_IDS, BOT_NAME, VERSION
+from config import PREFIX, OWNER_IDS, BOT_NAME, VERSION, DATA_FLUSH_INTERVAL, SHARD_COUNT, SHARD_IDS, POLICY_CACHE_TTL
 from database import DataManager
 from security import SecurityManager
+from log_sink import log_sink
+from delayed import delayed
+from message_queue import message_queues
+from outbound import outbound
 import database
 import security
 import utils
@@ -56,7 +60,7 @@ import events
 def get_prefix(bot, message):
     """Dynamic prefix function"""
     if message.guild:
-        return data_manager.get_prefix(message.guild.id)
+        return data_manager.get_policy(message.guild.id).prefix
     return PREFIX
 
 # Initialize intents
@@ -65,11 +69,42 @@ intents.message_content = True
 intents.members = True
 intents.moderation = True
 
+class DorothyBot(commands.AutoShardedBot):
+    """Bot with startup/shutdown hooks for background services"""
+    
+    async def setup_hook(self):
+        """Start background services once the event loop is running"""
+        data_manager.start_write_behind(DATA_FLUSH_INTERVAL)
+        security_manager.alerts.start()
+        outbound.start()
+        delayed.start()
+        message_queues.start()
+        await doro_ai.start_http_session()
+    
+    async def close(self):
+        """Stop background services, then disconnect"""
+        await message_queues.close()
+        await security_manager.alerts.close()
+        await log_sink.close()
+        await delayed.close()
+        await outbound.close()
+        await doro_ai.close_http_session()
+        await data_manager.close()
+        await super().close()
+
 # Initialize bot
-bot = commands.Bot(command_prefix=get_prefix, intents=intents, help_command=None)
+# Shards: all of them (count recommended by Discord), or the SHARD_IDS range of SHARD_COUNT
+bot = DorothyBot(
+    command_prefix=get_prefix, intents=intents, help_command=None,
+    shard_count=SHARD_COUNT, shard_ids=SHARD_IDS
+)
 
-# Initialize data manager
-data_manager = DataManager()
+# Initialize data manager (shared with localization/utils via the registry)
+data_manager = database.create_data_manager()
+database.set_data_manager(data_manager)
+if SHARD_IDS is not None:
+    # Other processes write to the same database: re-read cached settings periodically
+    data_manager.policy_ttl = POLICY_CACHE_TTL
 
 # Initialize security manager
 security_manager = SecurityManager(bot, data_manager)
@@ -116,6 +151,8 @@ if __name__ == "__main__":
     except UnicodeEncodeError:
         print(f"[INFO] Starting {BOT_NAME} v{VERSION}...")
         print(f"[INFO] Owner IDs: {OWNER_IDS}")
+    if SHARD_IDS is not None:
+        print(f"[INFO] Running shards {SHARD_IDS} of {SHARD_COUNT}")
     
     # Setup bot modules
     setup_bot()
@@ -128,3 +165,6 @@ if __name__ == "__main__":
             print(f"❌ Error: {e}")
         except UnicodeEncodeError:
             print(f"[ERROR] {e}")
+    finally:
+        # Force a final flush of write-behind data on shutdown
+        data_manager.flush()
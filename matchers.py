@@ -0,0 +1,131 @@
+"""
+Dorothy Bot - Matchers Module
+Compiled text matchers used by auto-moderation
+"""
+
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+from config import INVITE_PATTERNS, BLACKLIST_AUTOMATON_MIN_WORDS
+
+class BlacklistMatcher:
+    """Finds any blacklisted word in a single pass over the text
+
+    Small lists (the default blacklist and most servers) compile to one
+    regex alternation, which runs in C. From BLACKLIST_AUTOMATON_MIN_WORDS
+    words on the regex cost grows with the list, so an Aho-Corasick
+    automaton is used instead: slower per character, but independent of
+    the number of words. See benchmark_blacklist.py.
+    """
+
+    def __init__(self, words: Iterable[str], automaton_min_words: int = BLACKLIST_AUTOMATON_MIN_WORDS):
+        # Node 0 is the root; goto[node] maps a character to the next node
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[Optional[str]] = [None]
+        self.words = sorted({word.lower() for word in words if word})
+        self.pattern: Optional[re.Pattern] = None
+
+        if len(self.words) < automaton_min_words:
+            if self.words:
+                # Longest first so a word is reported rather than a shorter word it starts with
+                self.pattern = re.compile("|".join(map(re.escape, sorted(self.words, key=len, reverse=True))))
+            return
+        for word in self.words:
+            self._add_word(word)
+        self._build_links()
+
+    def _add_word(self, word: str):
+        node = 0
+        for char in word:
+            next_node = self.goto[node].get(char)
+            if next_node is None:
+                next_node = len(self.goto)
+                self.goto[node][char] = next_node
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(None)
+            node = next_node
+        if self.output[node] is None:
+            self.output[node] = word
+
+    def _build_links(self):
+        """Breadth-first construction of failure links"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                # Inherit a match ending here through the failure link (suffix words)
+                if self.output[child] is None:
+                    self.output[child] = self.output[self.fail[child]]
+
+    def search(self, text: str) -> Optional[str]:
+        """Return the first blacklisted word found in text (expects lowercased text)"""
+        if self.pattern is not None:
+            match = self.pattern.search(text)
+            return match.group() if match else None
+        goto, fail, output = self.goto, self.fail, self.output
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node] is not None:
+                return output[node]
+        return None
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+def normalize_domain(domain: str) -> str:
+    """Normalize a user-supplied domain (drop scheme, www. and trailing slash)"""
+    domain = domain.strip().lower()
+    for prefix in ("https://", "http://", "www."):
+        if domain.startswith(prefix):
+            domain = domain[len(prefix):]
+    return domain.rstrip("/")
+
+class LinkDetector:
+    """Precompiled link detector: a cheap substring prefilter, then one combined regex pass"""
+
+    def __init__(self, rules: Iterable[Tuple[str, str, str]]):
+        # Each rule is (link_type, prefilter keyword, regex); link types become named groups
+        self.rules = list(rules)
+        self.keywords = tuple({keyword for _, keyword, _ in self.rules})
+
+        grouped: Dict[str, List[str]] = {}
+        for link_type, _, pattern in self.rules:
+            grouped.setdefault(link_type, []).append(pattern)
+        self.pattern = re.compile("|".join(
+            f"(?P<{link_type}>{'|'.join(patterns)})" for link_type, patterns in grouped.items()
+        )) if grouped else None
+
+    def search(self, text: str) -> Optional[Tuple[str, str]]:
+        """Return (link_type, matched link) for the first link in text (expects lowercased text)"""
+        if self.pattern is None:
+            return None
+        # Common case: no keyword at all, so the regex never runs
+        for keyword in self.keywords:
+            if keyword in text:
+                break
+        else:
+            return None
+        match = self.pattern.search(text)
+        if match is None:
+            return None
+        return match.lastgroup, match.group(match.lastgroup)
+
+    def with_domains(self, domains: Iterable[str], link_type: str = "blocked_link") -> "LinkDetector":
+        """Create a detector that also matches links to the given domains (vanity domains, shorteners)"""
+        rules = list(self.rules)
+        for domain in domains:
+            rules.append((link_type, domain, r'(?<![\w.-])' + re.escape(domain) + r'/\S+'))
+        return LinkDetector(rules)
+
+# Shared detector for Discord invite links (every pattern contains "discord")
+INVITE_DETECTOR = LinkDetector(("invite_link", "discord", pattern) for pattern in INVITE_PATTERNS)
@@ -0,0 +1,180 @@
+"""
+Dorothy Bot - Message Queue Module
+Per-guild bounded queues for message handling, drained fairly by a worker pool
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+from config import MESSAGE_WORKERS, MESSAGE_QUEUE_SIZE, MESSAGE_GUILD_CONCURRENCY, MESSAGE_COSMETIC_WATERMARK
+from utils import latency_percentiles
+
+class MessageJob:
+    __slots__ = ("handler", "args", "cosmetic", "queued_at")
+
+    def __init__(self, handler: Callable[..., Awaitable[Any]], args: tuple, cosmetic: bool):
+        self.handler = handler
+        self.args = args
+        self.cosmetic = cosmetic
+        self.queued_at = time.monotonic()
+
+class GuildQueue:
+    """Pending jobs and counters of one guild"""
+
+    def __init__(self):
+        self.jobs = deque()
+        self.running = 0
+        self.stats = {"enqueued": 0, "processed": 0, "failed": 0, "shed_cosmetic": 0, "overflowed": 0}
+        self.wait_times = deque(maxlen=200)  # Seconds queued
+
+    def evict_cosmetic(self) -> bool:
+        """Drop the oldest queued cosmetic job (False if there is none)"""
+        for job in self.jobs:
+            if job.cosmetic:
+                self.jobs.remove(job)
+                return True
+        return False
+
+class GuildMessageQueues:
+    """Message handling spread fairly across guilds
+
+    Each guild has its own bounded queue. Workers serve the guilds with
+    queued work in round-robin order, one job per turn, and a guild never
+    has more than `guild_concurrency` jobs running, so a guild flooded
+    with spam only slows itself down. Backpressure sheds cosmetic work
+    first: past `cosmetic_watermark` of the queue size new cosmetic jobs
+    are refused, and a full queue evicts queued cosmetic jobs before it
+    refuses security work, which its caller then checks inline.
+    """
+
+    def __init__(self, workers: int, queue_size: int, guild_concurrency: int, cosmetic_watermark: float):
+        self.worker_count = workers
+        self.queue_size = queue_size
+        self.guild_concurrency = guild_concurrency
+        self.cosmetic_limit = int(queue_size * cosmetic_watermark)
+        self._guilds: Dict[int, GuildQueue] = {}
+        self._ready = deque()  # Guild ids with queued work and a free slot, in serving order
+        self._scheduled = set()  # Guild ids currently in _ready
+        self._wakeup: Optional[asyncio.Event] = None
+        self._workers = []
+
+    def start(self):
+        """Start the workers (needs a running event loop)"""
+        if self._wakeup is not None:
+            return
+        self._wakeup = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        self._workers = [loop.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    def submit(self, guild_id: int, handler: Callable[..., Awaitable[Any]], *args, cosmetic: bool = False) -> bool:
+        """Queue handler(*args) for a guild; False if backpressure refused it
+
+        Refused cosmetic jobs are simply dropped. Refused security jobs are
+        counted as overflowed; the caller should still run its cheap checks.
+        """
+        self.start()
+        queue = self._guilds.get(guild_id)
+        if queue is None:
+            queue = self._guilds[guild_id] = GuildQueue()
+
+        depth = len(queue.jobs)
+        if cosmetic and depth >= self.cosmetic_limit:
+            queue.stats["shed_cosmetic"] += 1
+            return False
+        if depth >= self.queue_size:
+            if cosmetic:
+                queue.stats["shed_cosmetic"] += 1
+                return False
+            if not queue.evict_cosmetic():
+                # Security work refused: the caller is expected to run the cheap checks inline
+                queue.stats["overflowed"] += 1
+                return False
+            queue.stats["shed_cosmetic"] += 1
+
+        queue.jobs.append(MessageJob(handler, args, cosmetic))
+        queue.stats["enqueued"] += 1
+        self._schedule(guild_id, queue)
+        return True
+
+    def _schedule(self, guild_id: int, queue: GuildQueue):
+        if queue.jobs and queue.running < self.guild_concurrency and guild_id not in self._scheduled:
+            self._scheduled.add(guild_id)
+            self._ready.append(guild_id)
+            self._wakeup.set()
+
+    async def _worker(self):
+        while True:
+            if not self._ready:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            guild_id = self._ready.popleft()
+            self._scheduled.discard(guild_id)
+            queue = self._guilds.get(guild_id)
+            if queue is None or not queue.jobs:
+                continue
+            job = queue.jobs.popleft()
+            queue.running += 1
+            # Back of the line: other guilds get a turn before this one's next job
+            self._schedule(guild_id, queue)
+
+            queue.wait_times.append(time.monotonic() - job.queued_at)
+            try:
+                await job.handler(*job.args)
+                queue.stats["processed"] += 1
+            except Exception as e:
+                queue.stats["failed"] += 1
+                print(f"[ERROR] Message handler failed in guild {guild_id}: {e}")
+            finally:
+                queue.running -= 1
+                if self._guilds.get(guild_id) is queue:
+                    self._schedule(guild_id, queue)
+
+    def forget_guild(self, guild_id: int):
+        """Drop the queue and counters of a guild the bot left"""
+        self._guilds.pop(guild_id, None)
+
+    async def close(self):
+        """Stop the workers (queued messages are discarded)"""
+        for task in self._workers:
+            task.cancel()
+        if self._workers:
+            await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._guilds.clear()
+        self._ready.clear()
+        self._scheduled.clear()
+        self._wakeup = None
+
+    def guild_stats(self, guild_id: int) -> Dict[str, Any]:
+        """Get queue depth, running jobs, counters and wait times of one guild"""
+        queue = self._guilds.get(guild_id)
+        if queue is None:
+            return {"depth": 0, "running": 0}
+        return {
+            **queue.stats,
+            "depth": len(queue.jobs),
+            "running": queue.running,
+            "wait_ms": latency_percentiles(queue.wait_times)
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get totals and the guilds with the deepest queues"""
+        totals = {"enqueued": 0, "processed": 0, "failed": 0, "shed_cosmetic": 0, "overflowed": 0}
+        for queue in self._guilds.values():
+            for key in totals:
+                totals[key] += queue.stats[key]
+        busiest = sorted(self._guilds, key=lambda guild_id: len(self._guilds[guild_id].jobs), reverse=True)[:5]
+        return {
+            **totals,
+            "guilds": len(self._guilds),
+            "depth": sum(len(queue.jobs) for queue in self._guilds.values()),
+            "busiest": {guild_id: self.guild_stats(guild_id) for guild_id in busiest}
+        }
+
+# Shared queues for guild message handling
+message_queues = GuildMessageQueues(
+    MESSAGE_WORKERS, MESSAGE_QUEUE_SIZE, MESSAGE_GUILD_CONCURRENCY, MESSAGE_COSMETIC_WATERMARK
+)
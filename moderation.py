@@ -9,6 +9,8 @@ from discord.ext import commands
 from typing import Optional
 from config import WARNING_LEVELS
 from database import DataManager
+from delayed import delayed
+from outbound import outbound, ENFORCEMENT, LOGGING
 from utils import (
     parse_time_string, format_duration, has_mod_permissions, has_admin_permissions,
     send_dm_notification, log_moderation_action
@@ -49,7 +51,8 @@ async def add_auto_warning(guild: discord.Guild, member: discord.Member, channel
         embed.add_field(name=get_text(guild_id, "warning_reason"), value=reason, inline=False)
         embed.set_footer(text="Auto-Moderation System")
         
-        await channel.send(embed=embed)
+        # Not awaited: a backed-up channel must not delay the punishment below
+        outbound.submit(LOGGING, f"send:{channel.id}", lambda: channel.send(embed=embed))
         
         # Send DM notification
         action_text = get_text(guild_id, "action_warned", count=warning_count)
@@ -66,7 +69,7 @@ async def add_auto_warning(guild: discord.Guild, member: discord.Member, channel
         if level_config["action"] == "timeout":
             try:
                 duration = timedelta(minutes=level_config["duration"])
-                await member.timeout(duration, reason=f"[AUTO] Warning #{warning_count}: {reason}")
+                await outbound.run(ENFORCEMENT, f"member:{member.guild.id}", lambda: member.timeout(duration, reason=f"[AUTO] Warning #{warning_count}: {reason}"))
             except:
                 pass
         
@@ -82,7 +85,7 @@ async def add_auto_warning(guild: discord.Guild, member: discord.Member, channel
                     extra_text,
                     guild_id
                 )
-                await member.kick(reason=f"[AUTO] Warning #{warning_count}: {reason}")
+                await outbound.run(ENFORCEMENT, f"member:{member.guild.id}", lambda: member.kick(reason=f"[AUTO] Warning #{warning_count}: {reason}"))
             except:
                 pass
         
@@ -98,7 +101,7 @@ async def add_auto_warning(guild: discord.Guild, member: discord.Member, channel
                     extra_text,
                     guild_id
                 )
-                await member.ban(reason=f"[AUTO] Warning #{warning_count}: {reason}")
+                await outbound.run(ENFORCEMENT, f"ban:{member.guild.id}", lambda: member.ban(reason=f"[AUTO] Warning #{warning_count}: {reason}"))
             except:
                 pass
 
@@ -158,7 +161,7 @@ def setup_commands(bot: commands.Bot):
             if level_config["action"] == "timeout":
                 try:
                     duration = timedelta(minutes=level_config['duration'])
-                    await member.timeout(duration, reason=f"Warning #{warning_count}: {reason}")
+                    await outbound.run(ENFORCEMENT, f"member:{member.guild.id}", lambda: member.timeout(duration, reason=f"Warning #{warning_count}: {reason}"))
                     await ctx.send(get_text(guild_id, "timeout_success", user=member.mention, duration=level_config['duration']))
                 except discord.Forbidden:
                     await ctx.send(get_text(guild_id, "error_forbidden_timeout"))
@@ -171,7 +174,7 @@ def setup_commands(bot: commands.Bot):
                         member, action_text, reason, ctx.guild.name,
                         extra_text, guild_id
                     )
-                    await member.kick(reason=f"Warning #{warning_count}: {reason}")
+                    await outbound.run(ENFORCEMENT, f"member:{member.guild.id}", lambda: member.kick(reason=f"Warning #{warning_count}: {reason}"))
                     await ctx.send(f"👢 {member.mention} đã bị kick khỏi server!")
                 except discord.Forbidden:
                     await ctx.send(get_text(guild_id, "error_forbidden_kick"))
@@ -184,7 +187,7 @@ def setup_commands(bot: commands.Bot):
                         member, action_text, reason, ctx.guild.name,
                         extra_text, guild_id
                     )
-                    await member.ban(reason=f"Warning #{warning_count}: {reason}")
+                    await outbound.run(ENFORCEMENT, f"ban:{member.guild.id}", lambda: member.ban(reason=f"Warning #{warning_count}: {reason}"))
                     await ctx.send(f"🔨 {member.mention} đã bị ban vĩnh viễn!")
                 except discord.Forbidden:
                     await ctx.send(get_text(guild_id, "error_forbidden_ban"))
@@ -194,7 +197,7 @@ def setup_commands(bot: commands.Bot):
         else:
             # Beyond level 10, auto-ban
             try:
-                await member.ban(reason=f"Excessive warnings: {warning_count}")
+                await outbound.run(ENFORCEMENT, f"ban:{member.guild.id}", lambda: member.ban(reason=f"Excessive warnings: {warning_count}"))
                 await ctx.send(get_text(guild_id, "warning_excessive", user=member.mention))
             except:
                 pass
@@ -271,7 +274,7 @@ def setup_commands(bot: commands.Bot):
                 ctx.guild.name, f"Thời gian mute: {format_duration(timeout_minutes)}"
             )
             
-            await member.timeout(timeout_duration, reason=reason)
+            await outbound.run(ENFORCEMENT, f"member:{member.guild.id}", lambda: member.timeout(timeout_duration, reason=reason))
             
             embed = discord.Embed(
                 title=get_text(guild_id, "timeout_title"),
@@ -299,7 +302,7 @@ def setup_commands(bot: commands.Bot):
     async def remove_timeout(ctx, member: discord.Member):
         """Gỡ timeout (unmute) cho thành viên"""
         try:
-            await member.timeout(None)
+            await outbound.run(ENFORCEMENT, f"member:{member.guild.id}", lambda: member.timeout(None))
             await ctx.send(f"✅ Đã gỡ timeout cho {member.mention}")
             await log_moderation_action(ctx.guild, "Remove Timeout", member, ctx.author)
         except discord.Forbidden:
@@ -335,7 +338,7 @@ def setup_commands(bot: commands.Bot):
                 extra_text, guild_id
             )
             
-            await member.kick(reason=reason)
+            await outbound.run(ENFORCEMENT, f"member:{member.guild.id}", lambda: member.kick(reason=reason))
             
             embed = discord.Embed(
                 title=get_text(guild_id, "kick_title"),
@@ -374,7 +377,7 @@ def setup_commands(bot: commands.Bot):
                 extra_text, guild_id
             )
             
-            await member.ban(reason=reason)
+            await outbound.run(ENFORCEMENT, f"ban:{member.guild.id}", lambda: member.ban(reason=reason))
             
             embed = discord.Embed(
                 title=get_text(guild_id, "ban_title"),
@@ -402,7 +405,7 @@ def setup_commands(bot: commands.Bot):
         
         try:
             user = await bot.fetch_user(user_id)
-            await ctx.guild.unban(user, reason=reason)
+            await outbound.run(ENFORCEMENT, f"ban:{ctx.guild.id}", lambda: ctx.guild.unban(user, reason=reason))
             
             embed = discord.Embed(
                 title=get_text(guild_id, "unban_title"),
@@ -433,9 +436,7 @@ def setup_commands(bot: commands.Bot):
         deleted = await ctx.channel.purge(limit=amount + 1)
         msg = await ctx.send(get_text(guild_id, "clear_success", count=len(deleted) - 1))
         
-        import asyncio
-        await asyncio.sleep(3)
-        await msg.delete()
+        delayed.delete_later(msg, 3)
 
     @bot.command(name='lock')
     @has_mod_permissions()
@@ -0,0 +1,188 @@
+"""
+Dorothy Bot - Outbound Module
+Priority scheduler for Discord side effects (moderation actions, DMs, messages)
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+from config import OUTBOUND_WORKERS, OUTBOUND_CLASS_LIMITS, OUTBOUND_ROUTE_LIMIT, OUTBOUND_QUEUE_LIMITS
+from utils import latency_percentiles
+
+# Priority classes, most important first
+CONTAINMENT = 0  # Stopping an active nuke/raid: role strips, raid mutes
+ENFORCEMENT = 1  # Punishments: timeouts, kicks, bans, deleting offending messages
+LOGGING = 2  # Log channel posts, alert and notification DMs
+CHATTER = 3  # Cosmetic replies, warnings, cleanup of bot messages
+
+CLASS_NAMES = {CONTAINMENT: "containment", ENFORCEMENT: "enforcement", LOGGING: "logging", CHATTER: "chatter"}
+
+class OutboundDropped(Exception):
+    """Raised to callers whose queued action was dropped because its class queue was full"""
+
+class OutboundJob:
+    __slots__ = ("priority", "route", "action", "future", "queued_at")
+
+    def __init__(self, priority: int, route: str, action: Callable[[], Awaitable[Any]], future: asyncio.Future):
+        self.priority = priority
+        self.route = route
+        self.action = action
+        self.future = future
+        self.queued_at = time.monotonic()
+
+class OutboundScheduler:
+    """Runs Discord side effects by priority class with per-route concurrency limits
+
+    Containment actions run immediately in the caller and ignore every
+    limit. Other classes are queued; workers always take the most important
+    queued job whose class is below its concurrency limit, so cosmetic
+    traffic can never occupy the capacity enforcement needs. Within a
+    class, a route (for example "send:<channel id>") has at most
+    `route_limit` requests in flight, roughly matching Discord's per-route
+    rate limit buckets. Route limits are counted per class so cosmetic
+    work on a route never delays enforcement on it, and jobs whose route
+    is full are skipped rather than blocking a worker. Classes listed in
+    `queue_limits` have bounded queues: when one is full its oldest job is
+    dropped (its caller gets OutboundDropped), so a flood of replies can't pile up and go out
+    minutes late.
+    """
+
+    def __init__(self, workers: int, class_limits: Dict[str, int], route_limit: int,
+                 queue_limits: Optional[Dict[str, int]] = None):
+        self.worker_count = workers
+        self.class_limits = class_limits
+        self.route_limit = route_limit
+        self.queue_limits = queue_limits or {}
+        self.stats = {
+            name: {"submitted": 0, "completed": 0, "failed": 0, "dropped": 0}
+            for name in CLASS_NAMES.values()
+        }
+        self.wait_times = {priority: deque(maxlen=500) for priority in CLASS_NAMES}  # Seconds queued
+        self._queues = {priority: deque() for priority in CLASS_NAMES}
+        self._running = {priority: 0 for priority in CLASS_NAMES}
+        self._route_in_flight: Dict[tuple, int] = {}  # (priority, route) -> running jobs
+        self._wakeup: Optional[asyncio.Event] = None
+        self._workers = []
+
+    def start(self):
+        """Start the workers (needs a running event loop)"""
+        if self._wakeup is not None:
+            return
+        self._wakeup = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        self._workers = [loop.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    async def run(self, priority: int, route: str, action: Callable[[], Awaitable[Any]]) -> Any:
+        """Run action at the given priority and return its result (exceptions propagate)"""
+        name = CLASS_NAMES[priority]
+        if priority == CONTAINMENT:
+            self.stats[name]["submitted"] += 1
+            self.wait_times[priority].append(0.0)
+            return await self._execute(priority, route, action)
+        return await self.submit(priority, route, action)
+
+    def submit(self, priority: int, route: str, action: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        """Queue action without waiting for it; the returned future holds its result"""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        # Fire-and-forget callers never read the result: don't warn about unretrieved errors
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        name = CLASS_NAMES[priority]
+        queue = self._queues[priority]
+        limit = self.queue_limits.get(name)
+        if limit is not None and len(queue) >= limit:
+            # Full: the oldest job is the least useful one to still deliver
+            dropped = queue.popleft()
+            if not dropped.future.done():
+                dropped.future.set_exception(OutboundDropped(f"{name} queue full"))
+            self.stats[name]["dropped"] += 1
+        queue.append(OutboundJob(priority, route, action, future))
+        self.stats[name]["submitted"] += 1
+        self._wakeup.set()
+        return future
+
+    def _next_job(self) -> Optional[OutboundJob]:
+        """Oldest job of the most important class with a free class slot and a free route slot"""
+        for priority, queue in self._queues.items():
+            limit = self.class_limits.get(CLASS_NAMES[priority], self.worker_count)
+            if not queue or self._running[priority] >= limit:
+                continue
+            for index, job in enumerate(queue):
+                if self._route_in_flight.get((priority, job.route), 0) < self.route_limit:
+                    del queue[index]
+                    return job
+        return None
+
+    async def _worker(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            if job.future.done():
+                continue  # Caller gave up (cancelled)
+
+            self.wait_times[job.priority].append(time.monotonic() - job.queued_at)
+            self._running[job.priority] += 1
+            try:
+                result = await self._execute(job.priority, job.route, job.action)
+            except Exception as e:
+                if not job.future.done():
+                    job.future.set_exception(e)
+            else:
+                if not job.future.done():
+                    job.future.set_result(result)
+            finally:
+                self._running[job.priority] -= 1
+                # A class or route slot freed up: let idle workers re-check the queues
+                self._wakeup.set()
+
+    async def _execute(self, priority: int, route: str, action: Callable[[], Awaitable[Any]]) -> Any:
+        stats = self.stats[CLASS_NAMES[priority]]
+        key = (priority, route)
+        self._route_in_flight[key] = self._route_in_flight.get(key, 0) + 1
+        try:
+            result = await action()
+            stats["completed"] += 1
+            return result
+        except Exception:
+            stats["failed"] += 1
+            raise
+        finally:
+            self._route_in_flight[key] -= 1
+            if not self._route_in_flight[key]:
+                del self._route_in_flight[key]
+
+    async def close(self):
+        """Stop the workers (queued jobs are cancelled)"""
+        for task in self._workers:
+            task.cancel()
+        if self._workers:
+            await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for queue in self._queues.values():
+            while queue:
+                queue.popleft().future.cancel()
+        self._wakeup = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-class counters, queue depth, running jobs and queue wait times"""
+        return {
+            "classes": {
+                name: {
+                    **self.stats[name],
+                    "queued": len(self._queues[priority]),
+                    "running": self._running[priority],
+                    "wait_ms": latency_percentiles(self.wait_times[priority])
+                }
+                for priority, name in CLASS_NAMES.items()
+            },
+            "busy_routes": {
+                f"{CLASS_NAMES[priority]}:{route}": count for (priority, route), count in self._route_in_flight.items()
+            }
+        }
+
+# Shared scheduler for every outbound Discord action
+outbound = OutboundScheduler(OUTBOUND_WORKERS, OUTBOUND_CLASS_LIMITS, OUTBOUND_ROUTE_LIMIT, OUTBOUND_QUEUE_LIMITS)
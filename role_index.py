@@ -0,0 +1,108 @@
+"""
+Dorothy Bot - Role Index Module
+Per-guild index of dangerous roles and the highest populated role
+"""
+
+from typing import Dict, Optional, Set
+import discord
+
+# Permissions that let a compromised account ban, kick or wipe the server
+DANGEROUS_PERMISSIONS = (
+    "administrator", "ban_members", "kick_members", "manage_guild", "manage_roles", "manage_channels"
+)
+
+def is_dangerous_role(role: discord.Role) -> bool:
+    """Whether a role grants permissions a nuker could abuse"""
+    permissions = role.permissions
+    return any(getattr(permissions, name) for name in DANGEROUS_PERMISSIONS)
+
+def is_alert_role(role: discord.Role) -> bool:
+    """Whether a role can receive security alerts (not @everyone or a bot's own role)"""
+    return not role.is_default() and not role.is_bot_managed()
+
+class RoleIndex:
+    """Dangerous role ids and the highest populated role of each guild, kept up to date from role events
+
+    A guild is indexed on first use. Role and member events then update it
+    incrementally; the highest populated role is only recomputed when the
+    cached one may have lost its last member or been changed.
+    """
+
+    def __init__(self):
+        self._dangerous: Dict[int, Set[int]] = {}
+        self._highest: Dict[int, Optional[int]] = {}  # guild -> role id (absent = needs recompute)
+        self.stats = {"guilds_indexed": 0, "highest_recomputes": 0}
+
+    # ==================== QUERIES ====================
+    def dangerous_ids(self, guild: discord.Guild) -> Set[int]:
+        """Ids of the guild's roles with dangerous permissions"""
+        ids = self._dangerous.get(guild.id)
+        if ids is None:
+            ids = self._dangerous[guild.id] = {role.id for role in guild.roles if is_dangerous_role(role)}
+            self.stats["guilds_indexed"] += 1
+        return ids
+
+    def highest_populated_role(self, guild: discord.Guild) -> Optional[discord.Role]:
+        """The highest role (excluding @everyone and bot roles) that has at least one member"""
+        if guild.id in self._highest:
+            role_id = self._highest[guild.id]
+            return guild.get_role(role_id) if role_id is not None else None
+
+        # One pass over members instead of role.members (itself a member scan) per role
+        self.stats["highest_recomputes"] += 1
+        highest = None
+        for member in guild.members:
+            for role in member.roles:
+                if (highest is None or role > highest) and is_alert_role(role):
+                    highest = role
+        self._highest[guild.id] = highest.id if highest is not None else None
+        return highest
+
+    # ==================== ROLE EVENTS ====================
+    def role_updated(self, role: discord.Role):
+        """Role created or edited: refresh its dangerous flag and the highest role"""
+        ids = self._dangerous.get(role.guild.id)
+        if ids is not None:
+            if is_dangerous_role(role):
+                ids.add(role.id)
+            else:
+                ids.discard(role.id)
+        # Position or bot-managed changes can reorder roles
+        self._highest.pop(role.guild.id, None)
+
+    def role_deleted(self, role: discord.Role):
+        ids = self._dangerous.get(role.guild.id)
+        if ids is not None:
+            ids.discard(role.id)
+        if self._highest.get(role.guild.id, role.id) == role.id:
+            self._highest.pop(role.guild.id, None)
+
+    # ==================== MEMBER EVENTS ====================
+    def member_roles_changed(self, before: discord.Member, after: discord.Member):
+        """A member gained or lost roles"""
+        guild_id = after.guild.id
+        if guild_id not in self._highest:
+            return
+        highest_id = self._highest[guild_id]
+        highest = after.guild.get_role(highest_id) if highest_id is not None else None
+
+        added = [role for role in after.roles if role not in before.roles and is_alert_role(role)]
+        top_added = max(added, default=None)
+        if top_added is not None and (highest is None or top_added > highest):
+            self._highest[guild_id] = top_added.id
+        elif highest is not None and highest in before.roles and highest not in after.roles:
+            self.member_left_role(after.guild, highest)
+
+    def member_removed(self, member: discord.Member):
+        """A member left: the highest role may now be empty"""
+        highest_id = self._highest.get(member.guild.id)
+        if highest_id is not None and any(role.id == highest_id for role in member.roles):
+            self.member_left_role(member.guild, member.guild.get_role(highest_id))
+
+    def member_left_role(self, guild: discord.Guild, role: Optional[discord.Role]):
+        if role is None or not role.members:
+            self._highest.pop(guild.id, None)
+
+    def forget_guild(self, guild_id: int):
+        self._dangerous.pop(guild_id, None)
+        self._highest.pop(guild_id, None)
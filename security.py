@@ -3,17 +3,52 @@ Dorothy Bot - Security Module
 Comprehensive security features including anti-nuke, anti-raid, anti-spam, and auto-moderation
 """
 
+import asyncio
 import discord
 import re
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Set
 from config import (
     RAID_DETECTION_THRESHOLD, RAID_DETECTION_WINDOW, RAID_MIN_ACCOUNT_AGE,
     SPAM_MESSAGE_THRESHOLD, SPAM_TIME_WINDOW, SPAM_MENTION_THRESHOLD, SPAM_DUPLICATE_THRESHOLD,
     NUKE_BAN_THRESHOLD, NUKE_KICK_THRESHOLD, NUKE_DELETE_THRESHOLD, NUKE_ROLE_DELETE_THRESHOLD, NUKE_TIME_WINDOW,
-    AUTO_MOD_CAPS_THRESHOLD, AUTO_MOD_CAPS_MIN_LENGTH, INVITE_PATTERNS, OWNER_IDS
+    AUTO_MOD_CAPS_THRESHOLD, AUTO_MOD_CAPS_MIN_LENGTH, OWNER_IDS,
+    AUDIT_LOG_WAIT, AUDIT_LOG_TTL, AUDIT_LOG_MAX_ENTRIES,
+    ALERT_WORKERS, ALERT_QUEUE_SIZE, ALERT_DEDUP_WINDOW, ALERT_DIGEST_WINDOW
 )
+from alerts import AlertDispatcher
+from audit_log import AuditLogIndex
 from database import DataManager
+from delayed import delayed
+from log_resolver import log_channels
+from log_sink import log_sink
+from matchers import LinkDetector
+from outbound import outbound, CONTAINMENT, ENFORCEMENT, LOGGING, CHATTER
+from role_index import RoleIndex
+
+# Punctuation stripped before comparing messages for duplicate spam
+PUNCTUATION_RE = re.compile(r'[^\w\s]')
+
+class MessageFeatures:
+    """Text features of one message, computed once and shared by every security check"""
+    __slots__ = ("content", "lower", "normalized", "content_hash", "length", "caps_ratio", "mention_count", "link")
+
+    def __init__(self, message: discord.Message, link_detector: LinkDetector):
+        content = message.content
+        self.content = content
+        self.lower = content.lower()
+        # Remove punctuation, extra spaces, and convert to lowercase
+        self.normalized = PUNCTUATION_RE.sub('', self.lower).strip()
+        self.content_hash = hash(self.normalized)
+        self.length = len(content)
+        self.caps_ratio = sum(map(str.isupper, content)) / self.length if self.length else 0.0
+        self.mention_count = len(message.mentions)
+        # (link_type, link) of the first invite/blocked link, or None
+        self.link = link_detector.search(self.lower)
+
+    @property
+    def has_invite(self) -> bool:
+        return self.link is not None and self.link[0] == "invite_link"
 
 class SecurityManager:
     """Manages all security features for the bot"""
@@ -21,6 +56,17 @@ class SecurityManager:
     def __init__(self, bot, data_manager: DataManager):
         self.bot = bot
         self.data = data_manager
+        self.audit_log = AuditLogIndex(AUDIT_LOG_TTL, AUDIT_LOG_MAX_ENTRIES)
+        self.roles = RoleIndex()
+        self.alerts = AlertDispatcher(ALERT_WORKERS, ALERT_QUEUE_SIZE, ALERT_DEDUP_WINDOW, ALERT_DIGEST_WINDOW)
+        self._background: Set[asyncio.Task] = set()
+    
+    def spawn(self, coro) -> asyncio.Task:
+        """Run a coroutine off the critical path (keeps a reference until it finishes)"""
+        task = asyncio.get_running_loop().create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
         
     # ==================== ANTI-RAID SYSTEM ====================
     async def check_raid(self, member: discord.Member) -> Optional[str]:
@@ -28,25 +74,16 @@ class SecurityManager:
         guild_id = str(member.guild.id)
         
         # Skip if anti-raid is disabled
-        if not self.data.get_security_setting(guild_id, "anti_raid_enabled", True):
+        if not self.data.get_policy(guild_id).anti_raid_enabled:
             return None
         
-        # Track the join
-        recent_joins = self.data.track_join(guild_id, str(member.id))
-        
-        # Count joins in the detection window
-        now = datetime.now()
-        window_start = now - timedelta(seconds=RAID_DETECTION_WINDOW)
-        
-        recent_count = 0
-        for join in recent_joins:
-            join_time = datetime.fromisoformat(join["timestamp"])
-            if join_time >= window_start:
-                recent_count += 1
+        # Track the join and count joins in the detection window
+        recent_count = self.data.track_join(guild_id, str(member.id))
         
         # Check if raid threshold exceeded
         if recent_count >= RAID_DETECTION_THRESHOLD:
             # Check account age
+            now = datetime.now()
             account_age = (now - member.created_at).days
             
             if account_age < RAID_MIN_ACCOUNT_AGE:
@@ -75,7 +112,10 @@ class SecurityManager:
             # Auto-mute for 7 days instead of kick
             try:
                 mute_duration = timedelta(days=7)
-                await member.timeout(mute_duration, reason=f"[AUTO] Raid Protection: {reason}")
+                await outbound.run(
+                    CONTAINMENT, f"member:{member.guild.id}",
+                    lambda: member.timeout(mute_duration, reason=f"[AUTO] Raid Protection: {reason}")
+                )
                 
                 # Send DM to user
                 action_text = get_text(guild_id, "action_muted_7days")
@@ -106,50 +146,40 @@ class SecurityManager:
             return False
     
     # ==================== ANTI-SPAM SYSTEM ====================
-    async def check_spam(self, message: discord.Message) -> Optional[Dict]:
+    def extract_features(self, message: discord.Message) -> MessageFeatures:
+        """Compute message features once for all checks"""
+        return MessageFeatures(message, self.data.get_policy(message.guild.id).link_detector)
+    
+    async def check_spam(self, message: discord.Message, features: Optional[MessageFeatures] = None) -> Optional[Dict]:
         """Check message for spam patterns"""
         if message.author.bot or not message.guild:
             return None
         
         guild_id = str(message.guild.id)
-        user_id = str(message.author.id)
-        channel_id = str(message.channel.id)
+        policy = self.data.get_policy(guild_id)
         
         # Skip if anti-spam is disabled, user is whitelisted, or channel is whitelisted
-        if not self.data.get_security_setting(guild_id, "anti_spam_enabled", True):
+        if not policy.anti_spam_enabled:
             return None
-        if self.data.is_whitelisted(guild_id, user_id):
+        if message.author.id in policy.whitelisted_users or message.channel.id in policy.whitelisted_channels:
             return None
-            
-        # Safely check if channel is whitelisted
-        try:
-            if self.data.is_channel_whitelisted(guild_id, channel_id):
-                return None
-        except KeyError:
-            # If whitelisted_channels doesn't exist yet, just continue
-            pass
         
-        # Track the message
-        recent_messages = self.data.track_message(guild_id, user_id, message.content)
+        if features is None:
+            features = self.extract_features(message)
+        
+        # Track the message (by normalized content hash) and count messages in the spam window
+        user_id = str(message.author.id)
+        spam_count = self.data.track_message(guild_id, user_id, features.content_hash)
         
         # Check mention spam
-        if len(message.mentions) >= SPAM_MENTION_THRESHOLD:
+        if features.mention_count >= SPAM_MENTION_THRESHOLD:
             return {
                 "type": "mention_spam",
-                "reason": f"Mentioned {len(message.mentions)} users in one message",
+                "reason": f"Mentioned {features.mention_count} users in one message",
                 "severity": "high"
             }
         
         # Check message spam (frequency)
-        now = datetime.now()
-        window_start = now - timedelta(seconds=SPAM_TIME_WINDOW)
-        
-        spam_count = 0
-        for msg in recent_messages:
-            msg_time = datetime.fromisoformat(msg["timestamp"])
-            if msg_time >= window_start:
-                spam_count += 1
-        
         if spam_count >= SPAM_MESSAGE_THRESHOLD:
             return {
                 "type": "message_spam",
@@ -157,19 +187,13 @@ class SecurityManager:
                 "severity": "medium"
             }
         
-        # Check duplicate messages
-        if len(recent_messages) >= SPAM_DUPLICATE_THRESHOLD:
-            # Get normalized content of recent messages (lowercase, strip punctuation)
-            import re
-            def normalize_content(text):
-                # Remove punctuation, extra spaces, and convert to lowercase
-                return re.sub(r'[^\w\s]', '', text).lower().strip()
-                
-            last_messages = [normalize_content(msg["content"]) for msg in recent_messages[-SPAM_DUPLICATE_THRESHOLD:]]
-            current_normalized = normalize_content(message.content)
+        # Check duplicate messages (recent entries are normalized content hashes)
+        recent_messages = self.data.get_recent_messages(guild_id, user_id)
+        if len(recent_messages) >= SPAM_DUPLICATE_THRESHOLD and features.normalized:
+            last_messages = recent_messages[-SPAM_DUPLICATE_THRESHOLD:]
             
             # If all normalized messages are the same, count as spam
-            if len(set(last_messages)) == 1 and current_normalized == last_messages[0] and current_normalized != "":
+            if last_messages.count(features.content_hash) == SPAM_DUPLICATE_THRESHOLD:
                 return {
                     "type": "duplicate_spam",
                     "reason": f"Repeated similar messages {SPAM_DUPLICATE_THRESHOLD} times",
@@ -188,12 +212,15 @@ class SecurityManager:
             guild_id = str(message.guild.id)
             
             # Delete the spam message
-            await message.delete()
+            await outbound.run(ENFORCEMENT, f"delete:{message.channel.id}", message.delete)
             
             # Auto-mute for 7 days
             try:
                 mute_duration = timedelta(days=7)
-                await message.author.timeout(mute_duration, reason=f"[AUTO-MOD] Spam detected: {spam_info['reason']}")
+                await outbound.run(
+                    ENFORCEMENT, f"member:{message.guild.id}",
+                    lambda: message.author.timeout(mute_duration, reason=f"[AUTO-MOD] Spam detected: {spam_info['reason']}")
+                )
                 
                 # Send DM to user
                 action_text = get_text(guild_id, "action_muted_7days")
@@ -216,7 +243,8 @@ class SecurityManager:
                 f"User: {message.author.mention} (`{message.author.id}`)\n"
                 f"Type: {spam_info['type']}\n"
                 f"Reason: {spam_info['reason']}\n"
-                f"Action: Auto-muted for 7 days"
+                f"Action: Auto-muted for 7 days",
+                log_to_channel=False  # on_message posts the "Spam Detected" log entry
             )
             
             # Log the spam
@@ -241,34 +269,33 @@ class SecurityManager:
             return False
     
     # ==================== ANTI-NUKE SYSTEM ====================
+    async def resolve_moderator(self, guild: discord.Guild, action: discord.AuditLogAction,
+                                target_id: int) -> Optional[discord.Member]:
+        """Find who performed an action from the audit log index (no API call)"""
+        entry = await self.audit_log.resolve(guild.id, action, target_id, AUDIT_LOG_WAIT)
+        if entry is None or not isinstance(entry.user, discord.Member):
+            return None
+        return entry.user
+    
     async def check_nuke_action(self, guild: discord.Guild, moderator: discord.Member, action_type: str) -> bool:
         """Check if moderation action is part of nuke attempt"""
         guild_id = str(guild.id)
         moderator_id = str(moderator.id)
         
+        policy = self.data.get_policy(guild_id)
+        
         # Skip if anti-nuke is disabled
-        if not self.data.get_security_setting(guild_id, "anti_nuke_enabled", True):
+        if not policy.anti_nuke_enabled:
             return False
         
         # Skip if moderator is owner or whitelisted
         if moderator.id == guild.owner_id or moderator.id in OWNER_IDS:
             return False
-        if self.data.is_whitelisted(guild_id, moderator_id):
+        if moderator.id in policy.whitelisted_users:
             return False
         
-        # Track the action
-        recent_actions = self.data.track_moderation_action(guild_id, action_type, moderator_id)
-        
-        # Count actions in the detection window
-        now = datetime.now()
-        window_start = now - timedelta(seconds=NUKE_TIME_WINDOW)
-        
-        action_count = 0
-        for action in recent_actions:
-            if action["action"] == action_type:
-                action_time = datetime.fromisoformat(action["timestamp"])
-                if action_time >= window_start:
-                    action_count += 1
+        # Track the action and count same-type actions in the detection window
+        action_count = self.data.track_moderation_action(guild_id, action_type, moderator_id)
         
         # Check thresholds based on action type
         threshold = 0
@@ -300,21 +327,44 @@ class SecurityManager:
     async def handle_nuke_attempt(self, guild: discord.Guild, moderator: discord.Member, action_type: str):
         """Handle detected nuke attempt"""
         try:
-            # Remove all permissions from the nuker
-            for role in moderator.roles:
-                if role.permissions.administrator or role.permissions.ban_members or role.permissions.kick_members:
-                    try:
-                        await moderator.remove_roles(role, reason="[AUTO] Nuke attempt detected")
-                    except:
-                        pass
+            # Roles we are able to take away (below our top role, not integration-managed)
+            me = guild.me
+            dangerous_ids = self.roles.dangerous_ids(guild)
+            dangerous = [
+                role for role in moderator.roles
+                if role.id in dangerous_ids and not role.managed and (me is None or role < me.top_role)
+            ]
             
-            # Timeout the nuker
-            try:
-                await moderator.timeout(timedelta(days=28), reason="[AUTO] Nuke attempt detected")
-            except:
-                pass
+            # Containment: strip every dangerous role in one edit while timing out in parallel.
+            # It runs ahead of every queued outbound action and ignores the scheduler's limits.
+            route = f"member:{guild.id}"
+            def timeout():
+                return moderator.timeout(timedelta(days=28), reason="[AUTO] Nuke attempt detected")
+            actions = [outbound.run(CONTAINMENT, route, timeout)]
+            if dangerous:
+                keep = [role for role in moderator.roles if role not in dangerous and not role.is_default()]
+                actions.insert(0, outbound.run(
+                    CONTAINMENT, route, lambda: moderator.edit(roles=keep, reason="[AUTO] Nuke attempt detected")
+                ))
+            results = await asyncio.gather(*actions, return_exceptions=True)
+            
+            # Administrators cannot be timed out, so retry once their roles are gone
+            if dangerous and not isinstance(results[0], Exception) and isinstance(results[-1], Exception):
+                try:
+                    await outbound.run(CONTAINMENT, route, timeout)
+                except:
+                    pass
             
-            # Send alert to owner
+            # Alerts are sent after containment, without holding it up
+            self.spawn(self.send_nuke_alerts(guild, moderator, action_type))
+            return True
+        except Exception as e:
+            print(f"Failed to handle nuke attempt: {e}")
+            return False
+    
+    async def send_nuke_alerts(self, guild: discord.Guild, moderator: discord.Member, action_type: str):
+        """Alert the owner and the security log about a contained nuke attempt"""
+        async def alert_owner():
             owner = guild.owner
             if owner:
                 try:
@@ -328,79 +378,76 @@ class SecurityManager:
                     embed.add_field(name="Moderator", value=f"{moderator.mention} ({moderator.id})", inline=True)
                     embed.add_field(name="Auto-Response", value="✅ Removed permissions and timed out user", inline=False)
                     embed.set_footer(text="Dorothy Security System")
-                    await owner.send(embed=embed)
+                    await outbound.run(LOGGING, f"dm:{owner.id}", lambda: owner.send(embed=embed))
                 except:
                     pass
-            
+        
+        async def alert_log_channel():
             # Send to security log channel if exists
-            log_channel = discord.utils.get(guild.text_channels, name="security-log")
+            log_channel = log_channels.resolve(guild, "security-log")
             if log_channel:
-                embed = discord.Embed(
-                    title="🚨 NUKE ATTEMPT BLOCKED",
-                    description=f"**{moderator.mention}** attempted mass {action_type}",
-                    color=discord.Color.red(),
-                    timestamp=datetime.now()
-                )
-                embed.add_field(name="User", value=f"{moderator.mention} ({moderator.id})", inline=False)
-                embed.add_field(name="Action", value=f"Attempted mass {action_type}", inline=False)
-                embed.add_field(name="Response", value="Removed permissions and timed out", inline=False)
-                await log_channel.send(embed=embed)
-            
-            return True
-        except Exception as e:
-            print(f"Failed to handle nuke attempt: {e}")
-            return False
+                try:
+                    embed = discord.Embed(
+                        title="🚨 NUKE ATTEMPT BLOCKED",
+                        description=f"**{moderator.mention}** attempted mass {action_type}",
+                        color=discord.Color.red(),
+                        timestamp=datetime.now()
+                    )
+                    embed.add_field(name="User", value=f"{moderator.mention} ({moderator.id})", inline=False)
+                    embed.add_field(name="Action", value=f"Attempted mass {action_type}", inline=False)
+                    embed.add_field(name="Response", value="Removed permissions and timed out", inline=False)
+                    # Urgent: flushes the channel's pending logs right away
+                    log_sink.post(log_channel, embed, urgent=True)
+                except:
+                    pass
+        
+        await asyncio.gather(alert_owner(), alert_log_channel())
     
     # ==================== AUTO-MODERATION SYSTEM ====================
-    async def check_auto_mod(self, message: discord.Message) -> Optional[Dict]:
+    async def check_auto_mod(self, message: discord.Message, features: Optional[MessageFeatures] = None) -> Optional[Dict]:
         """Check message for auto-moderation triggers"""
         if message.author.bot or not message.guild:
             return None
         
         guild_id = str(message.guild.id)
-        user_id = str(message.author.id)
-        channel_id = str(message.channel.id)
+        policy = self.data.get_policy(guild_id)
         
         # Skip if auto-mod is disabled, user is whitelisted, or channel is whitelisted
-        if not self.data.get_security_setting(guild_id, "auto_mod_enabled", True):
+        if not policy.auto_mod_enabled:
             return None
-        if self.data.is_whitelisted(guild_id, user_id):
+        if message.author.id in policy.whitelisted_users or message.channel.id in policy.whitelisted_channels:
             return None
-            
-        # Safely check if channel is whitelisted
-        try:
-            if self.data.is_channel_whitelisted(guild_id, channel_id):
-                return None
-        except KeyError:
-            # If whitelisted_channels doesn't exist yet, just continue
-            pass
         
-        content = message.content
+        if features is None:
+            features = self.extract_features(message)
         
-        # Check for blacklisted words
-        blacklist = self.data.get_blacklist_words(guild_id)
-        content_lower = content.lower()
-        for word in blacklist:
-            if word in content_lower:
-                return {
-                    "type": "blacklisted_word",
-                    "reason": f"Used blacklisted word: {word}",
-                    "severity": "high"
-                }
+        # Check for blacklisted words (single pass over the message)
+        word = policy.blacklist.search(features.lower)
+        if word:
+            return {
+                "type": "blacklisted_word",
+                "reason": f"Used blacklisted word: {word}",
+                "severity": "high"
+            }
         
-        # Check for invite links
-        for pattern in INVITE_PATTERNS:
-            if re.search(pattern, content):
+        # Check for invite links and server-blocked link domains
+        if features.link:
+            link_type, link_text = features.link
+            if features.has_invite:
                 return {
                     "type": "invite_link",
                     "reason": "Posted Discord invite link",
                     "severity": "medium"
                 }
+            return {
+                "type": link_type,
+                "reason": f"Posted blocked link: {link_text}",
+                "severity": "medium"
+            }
         
         # Check for excessive caps
-        if len(content) >= AUTO_MOD_CAPS_MIN_LENGTH:
-            caps_count = sum(1 for c in content if c.isupper())
-            caps_percentage = (caps_count / len(content)) * 100
+        if features.length >= AUTO_MOD_CAPS_MIN_LENGTH:
+            caps_percentage = features.caps_ratio * 100
             
             if caps_percentage >= AUTO_MOD_CAPS_THRESHOLD:
                 return {
@@ -415,20 +462,19 @@ class SecurityManager:
         """Handle auto-moderation trigger"""
         try:
             # Delete the message
-            await message.delete()
+            await outbound.run(ENFORCEMENT, f"delete:{message.channel.id}", message.delete)
             
-            # Send warning
-            warning_msg = await message.channel.send(
-                f"⚠️ {message.author.mention} {mod_info['reason']}"
+            # Send warning without waiting: it is cosmetic and must not hold up the warning and logging below
+            warning = outbound.submit(
+                CHATTER, f"send:{message.channel.id}",
+                lambda: message.channel.send(f"⚠️ {message.author.mention} {mod_info['reason']}")
             )
             
-            # Auto-delete warning after 5 seconds
-            import asyncio
-            await asyncio.sleep(5)
-            try:
-                await warning_msg.delete()
-            except:
-                pass
+            # Auto-delete the warning 5 seconds after it was sent (if it was)
+            def schedule_cleanup(future):
+                if not future.cancelled() and future.exception() is None:
+                    delayed.delete_later(future.result(), 5)
+            warning.add_done_callback(schedule_cleanup)
             
             # Give automatic warning for high severity
             if mod_info["severity"] == "high":
@@ -457,11 +503,15 @@ class SecurityManager:
             print(f"Failed to handle auto-mod: {e}")
             return False
     
-    async def notify_highest_role(self, guild: discord.Guild, message: str):
-        """Notify members with highest role about security event"""
+    async def notify_highest_role(self, guild: discord.Guild, message: str, log_to_channel: bool = True):
+        """Notify members with highest role about security event (delivery happens in the background)
+
+        Callers that already log the event to the security log pass
+        log_to_channel=False so it is posted there only once.
+        """
         try:
             # Send to security-log channel
-            security_channel = discord.utils.get(guild.text_channels, name="security-log")
+            security_channel = log_channels.resolve(guild, "security-log") if log_to_channel else None
             if security_channel:
                 embed = discord.Embed(
                     title="🚨 Security Alert",
@@ -470,35 +520,15 @@ class SecurityManager:
                     timestamp=datetime.now()
                 )
                 embed.set_footer(text=f"Server: {guild.name}")
-                try:
-                    await security_channel.send(embed=embed)
-                except:
-                    pass
+                log_sink.post(security_channel, embed)
             
             # Get the highest role (excluding @everyone and bot roles)
-            highest_role = None
-            for role in sorted(guild.roles, key=lambda r: r.position, reverse=True):
-                if role.name != "@everyone" and not role.is_bot_managed() and len(role.members) > 0:
-                    highest_role = role
-                    break
+            highest_role = self.roles.highest_populated_role(guild)
             
             if not highest_role:
                 return
             
-            # Send DM to all members with the highest role
-            embed = discord.Embed(
-                title="🚨 Security Alert",
-                description=message,
-                color=discord.Color.red(),
-                timestamp=datetime.now()
-            )
-            embed.set_footer(text=f"Server: {guild.name}")
-            
-            for member in highest_role.members:
-                if not member.bot:
-                    try:
-                        await member.send(embed=embed)
-                    except:
-                        pass  # Ignore if DM fails
+            # Queue a DM for all members with the highest role
+            self.alerts.notify(guild, [member for member in highest_role.members if not member.bot], message)
         except Exception as e:
             print(f"Failed to notify highest role: {e}")
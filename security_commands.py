@@ -237,3 +237,37 @@ def setup_commands(bot: commands.Bot):
             await ctx.send(get_text(guild_id, "blacklist_removed", word=word))
         else:
             await ctx.send(get_text(guild_id, "blacklist_usage"))
+    
+    @bot.command(name='blocklink', aliases=['blink'])
+    @has_admin_permissions()
+    async def block_link(ctx, action: str = None, *, domain: str = None):
+        """Manage blocked link domains / Quản lý tên miền bị chặn"""
+        from localization import get_text
+        guild_id = str(ctx.guild.id)
+        
+        if action is None:
+            # Show current blocked domains
+            domains = data_manager.get_blocked_domains(guild_id)
+            if domains:
+                embed = discord.Embed(
+                    title=get_text(guild_id, "blocklink_title"),
+                    description=", ".join([f"`{d}`" for d in domains[:20]]),
+                    color=discord.Color.orange()
+                )
+                await ctx.send(embed=embed)
+            else:
+                await ctx.send(get_text(guild_id, "blocklink_empty"))
+            return
+        
+        if not domain:
+            await ctx.send(get_text(guild_id, "blocklink_usage"))
+            return
+        
+        if action.lower() in ['add', 'thêm', '+']:
+            data_manager.add_blocked_domain(guild_id, domain)
+            await ctx.send(get_text(guild_id, "blocklink_added", domain=domain))
+        elif action.lower() in ['remove', 'xóa', '-', 'rm']:
+            data_manager.remove_blocked_domain(guild_id, domain)
+            await ctx.send(get_text(guild_id, "blocklink_removed", domain=domain))
+        else:
+            await ctx.send(get_text(guild_id, "blocklink_usage"))
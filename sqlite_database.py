@@ -0,0 +1,434 @@
+"""
+Dorothy Bot - SQLite Database Module
+SQLite storage backend behind the DataManager API
+"""
+
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+from database import DataManager
+from matchers import normalize_domain
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS warnings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    guild_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    reason TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_warnings_member ON warnings (guild_id, user_id);
+CREATE TABLE IF NOT EXISTS security_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    guild_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    details TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_security_logs_guild ON security_logs (guild_id, id);
+CREATE TABLE IF NOT EXISTS settings (
+    guild_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT,
+    PRIMARY KEY (guild_id, key)
+);
+CREATE TABLE IF NOT EXISTS whitelisted_users (
+    guild_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    PRIMARY KEY (guild_id, user_id)
+);
+CREATE TABLE IF NOT EXISTS whitelisted_channels (
+    guild_id TEXT NOT NULL,
+    channel_id TEXT NOT NULL,
+    PRIMARY KEY (guild_id, channel_id)
+);
+CREATE TABLE IF NOT EXISTS blacklisted_words (
+    guild_id TEXT NOT NULL,
+    word TEXT NOT NULL,
+    PRIMARY KEY (guild_id, word)
+);
+CREATE TABLE IF NOT EXISTS dm_blocked_users (
+    user_id TEXT PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    reason TEXT
+);
+"""
+
+# Keep only the last N security logs per server (same as the JSON backend)
+SECURITY_LOG_LIMIT = 100
+
+class SQLiteDataManager(DataManager):
+    """DataManager backed by SQLite (WAL mode): every mutation is a small indexed write"""
+
+    def __init__(self, filename="dorothy_data.db", migrate_from: Optional[str] = "dorothy_data.json"):
+        self.filename = filename
+        self.conn = sqlite3.connect(filename)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+        # Ephemeral tracking state stays in memory, it is never persisted
+        self.data = {}
+        self._init_manager_state()
+
+        # One-shot import of the legacy JSON document
+        if migrate_from and os.path.exists(migrate_from) and not self._get_meta("json_migrated"):
+            import_json_data(self.conn, migrate_from)
+
+    # ==================== PERSISTENCE ====================
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def save_data(self):
+        """No-op: every mutation is committed as it happens"""
+        self.write_stats["save_requests"] += 1
+
+    def flush(self):
+        """No-op: SQLite commits on every mutation"""
+
+    async def flush_async(self):
+        """No-op: SQLite commits on every mutation"""
+
+    def start_write_behind(self, interval: float = 5.0):
+        """No-op: SQLite writes are already incremental"""
+
+    async def close(self):
+        """Close the database connection"""
+        self.conn.close()
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        """Execute a write statement and commit"""
+        with self.conn:
+            return self.conn.execute(sql, params)
+
+    def _get_setting(self, guild_id: str, key: str, default: Any = None) -> Any:
+        row = self.conn.execute(
+            "SELECT value FROM settings WHERE guild_id = ? AND key = ?", (str(guild_id), key)
+        ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_setting(self, guild_id: str, key: str, value: Any):
+        self._execute(
+            "INSERT OR REPLACE INTO settings (guild_id, key, value) VALUES (?, ?, ?)",
+            (str(guild_id), key, json.dumps(value))
+        )
+
+    def _delete_setting(self, guild_id: str, key: str) -> bool:
+        cursor = self._execute("DELETE FROM settings WHERE guild_id = ? AND key = ?", (str(guild_id), key))
+        return cursor.rowcount > 0
+
+    # ==================== WARNING SYSTEM ====================
+    def add_warning(self, guild_id: str, user_id: str, reason: str = "") -> int:
+        """Add warning to user and return total warning count"""
+        guild_id, user_id = str(guild_id), str(user_id)
+        count = self.get_warnings(guild_id, user_id) + 1
+        self._execute(
+            "INSERT INTO warnings (guild_id, user_id, timestamp, count, reason) VALUES (?, ?, ?, ?, ?)",
+            (guild_id, user_id, datetime.now().isoformat(), count, reason)
+        )
+        return count
+
+    def get_warnings(self, guild_id: str, user_id: str) -> int:
+        """Get total warning count for user"""
+        row = self.conn.execute(
+            "SELECT COUNT(*) FROM warnings WHERE guild_id = ? AND user_id = ?", (str(guild_id), str(user_id))
+        ).fetchone()
+        return row[0]
+
+    def clear_warnings(self, guild_id: str, user_id: str) -> bool:
+        """Clear all warnings for user"""
+        cursor = self._execute(
+            "DELETE FROM warnings WHERE guild_id = ? AND user_id = ?", (str(guild_id), str(user_id))
+        )
+        return cursor.rowcount > 0
+
+    # ==================== PREFIX SYSTEM ====================
+    def set_prefix(self, guild_id: str, prefix: str):
+        """Set custom prefix for server"""
+        self._set_setting(guild_id, "prefix", prefix)
+        self._invalidate_policy(guild_id)
+
+    def get_prefix(self, guild_id: str) -> str:
+        """Get custom prefix for server"""
+        from config import PREFIX
+        return self._get_setting(guild_id, "prefix", PREFIX)
+
+    # ==================== SECURITY SETTINGS ====================
+    def set_security_setting(self, guild_id: str, setting: str, enabled: bool):
+        """Enable/disable security feature for server"""
+        self._set_setting(guild_id, setting, enabled)
+        self._invalidate_policy(guild_id)
+
+    def get_security_setting(self, guild_id: str, setting: str, default: bool = True) -> bool:
+        """Get security setting for server"""
+        return self._get_setting(guild_id, setting, default)
+
+    # ==================== WHITELIST SYSTEM ====================
+    def add_whitelist(self, guild_id: str, user_id: str):
+        """Add user to whitelist"""
+        self._execute(
+            "INSERT OR IGNORE INTO whitelisted_users (guild_id, user_id) VALUES (?, ?)", (str(guild_id), str(user_id))
+        )
+        self._invalidate_policy(guild_id)
+
+    def remove_whitelist(self, guild_id: str, user_id: str):
+        """Remove user from whitelist"""
+        self._execute(
+            "DELETE FROM whitelisted_users WHERE guild_id = ? AND user_id = ?", (str(guild_id), str(user_id))
+        )
+        self._invalidate_policy(guild_id)
+
+    def is_whitelisted(self, guild_id: str, user_id: str) -> bool:
+        """Check if user is whitelisted"""
+        row = self.conn.execute(
+            "SELECT 1 FROM whitelisted_users WHERE guild_id = ? AND user_id = ?", (str(guild_id), str(user_id))
+        ).fetchone()
+        return row is not None
+
+    def _get_id_list(self, section: str, guild_id: str) -> List[str]:
+        """Get whitelisted user/channel IDs for server"""
+        column = "user_id" if section == "whitelisted_users" else "channel_id"
+        rows = self.conn.execute(f"SELECT {column} FROM {section} WHERE guild_id = ?", (str(guild_id),)).fetchall()
+        return [row[0] for row in rows]
+
+    # ==================== CHANNEL WHITELIST SYSTEM ====================
+    def add_whitelist_channel(self, guild_id: str, channel_id: str):
+        """Add channel to whitelist (immune to security checks)"""
+        self._execute(
+            "INSERT OR IGNORE INTO whitelisted_channels (guild_id, channel_id) VALUES (?, ?)",
+            (str(guild_id), str(channel_id))
+        )
+        self._invalidate_policy(guild_id)
+
+    def remove_whitelist_channel(self, guild_id: str, channel_id: str):
+        """Remove channel from whitelist"""
+        self._execute(
+            "DELETE FROM whitelisted_channels WHERE guild_id = ? AND channel_id = ?", (str(guild_id), str(channel_id))
+        )
+        self._invalidate_policy(guild_id)
+
+    def is_channel_whitelisted(self, guild_id: str, channel_id: str) -> bool:
+        """Check if channel is whitelisted (immune to security checks)"""
+        row = self.conn.execute(
+            "SELECT 1 FROM whitelisted_channels WHERE guild_id = ? AND channel_id = ?", (str(guild_id), str(channel_id))
+        ).fetchone()
+        return row is not None
+
+    # ==================== BLACKLIST WORDS ====================
+    def add_blacklist_word(self, guild_id: str, word: str):
+        """Add word to server blacklist"""
+        self._execute(
+            "INSERT OR IGNORE INTO blacklisted_words (guild_id, word) VALUES (?, ?)", (str(guild_id), word.lower())
+        )
+        self._invalidate_policy(guild_id)
+
+    def remove_blacklist_word(self, guild_id: str, word: str):
+        """Remove word from server blacklist"""
+        self._execute(
+            "DELETE FROM blacklisted_words WHERE guild_id = ? AND word = ?", (str(guild_id), word.lower())
+        )
+        self._invalidate_policy(guild_id)
+
+    def get_blacklist_words(self, guild_id: str) -> List[str]:
+        """Get all blacklisted words for server"""
+        from config import DEFAULT_BLACKLIST
+        rows = self.conn.execute(
+            "SELECT word FROM blacklisted_words WHERE guild_id = ?", (str(guild_id),)
+        ).fetchall()
+        return list(set(DEFAULT_BLACKLIST + [row[0] for row in rows]))
+
+    # ==================== BLOCKED LINKS ====================
+    def add_blocked_domain(self, guild_id: str, domain: str):
+        """Add link domain (vanity invite, URL shortener...) to server block list"""
+        domains = self.get_blocked_domains(guild_id)
+        domain = normalize_domain(domain)
+        if domain and domain not in domains:
+            self._set_setting(guild_id, "blocked_link_domains", domains + [domain])
+            self._invalidate_policy(guild_id)
+
+    def remove_blocked_domain(self, guild_id: str, domain: str):
+        """Remove link domain from server block list"""
+        domains = self.get_blocked_domains(guild_id)
+        domain = normalize_domain(domain)
+        if domain in domains:
+            domains.remove(domain)
+            self._set_setting(guild_id, "blocked_link_domains", domains)
+            self._invalidate_policy(guild_id)
+
+    def get_blocked_domains(self, guild_id: str) -> List[str]:
+        """Get blocked link domains for server"""
+        return self._get_setting(guild_id, "blocked_link_domains", [])
+
+    # ==================== SECURITY LOGS ====================
+    def add_security_log(self, guild_id: str, log_type: str, details: Dict):
+        """Add security log entry"""
+        guild_id = str(guild_id)
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO security_logs (guild_id, type, timestamp, details) VALUES (?, ?, ?, ?)",
+                (guild_id, log_type, datetime.now().isoformat(), json.dumps(details, ensure_ascii=False))
+            )
+            # Keep only last 100 logs per server
+            self.conn.execute(
+                "DELETE FROM security_logs WHERE guild_id = ? AND id <= "
+                "(SELECT id FROM security_logs WHERE guild_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (guild_id, guild_id, SECURITY_LOG_LIMIT)
+            )
+
+    def get_security_logs(self, guild_id: str, limit: int = 10) -> List[Dict]:
+        """Get recent security logs"""
+        rows = self.conn.execute(
+            "SELECT type, timestamp, details FROM security_logs WHERE guild_id = ? ORDER BY id DESC LIMIT ?",
+            (str(guild_id), limit)
+        ).fetchall()
+        return [
+            {"type": log_type, "timestamp": timestamp, "details": json.loads(details) if details else {}}
+            for log_type, timestamp, details in reversed(rows)
+        ]
+
+    # ==================== LANGUAGE SYSTEM ====================
+    def set_language(self, guild_id: str, language: str):
+        """Set language for server"""
+        self._set_setting(guild_id, "language", language)
+        self._invalidate_policy(guild_id)
+
+    def get_language(self, guild_id: str) -> str:
+        """Get language for server (default: en)"""
+        return self._get_setting(guild_id, "language", "en")
+
+    # ==================== DM BLOCK SYSTEM ====================
+    def block_dm_user(self, user_id: str, reason: str = "DM Spam"):
+        """Block user from DMing bot"""
+        self._execute(
+            "INSERT OR REPLACE INTO dm_blocked_users (user_id, timestamp, reason) VALUES (?, ?, ?)",
+            (str(user_id), datetime.now().isoformat(), reason)
+        )
+
+    def is_dm_blocked(self, user_id: str) -> bool:
+        """Check if user is blocked from DMing bot"""
+        row = self.conn.execute("SELECT 1 FROM dm_blocked_users WHERE user_id = ?", (str(user_id),)).fetchone()
+        return row is not None
+
+    def unblock_dm_user(self, user_id: str):
+        """Unblock user from DMing bot"""
+        self._execute("DELETE FROM dm_blocked_users WHERE user_id = ?", (str(user_id),))
+
+    def get_dm_blocked_users(self) -> Dict[str, Dict]:
+        """Get all users blocked from DMing bot"""
+        rows = self.conn.execute("SELECT user_id, timestamp, reason FROM dm_blocked_users").fetchall()
+        return {user_id: {"timestamp": timestamp, "reason": reason} for user_id, timestamp, reason in rows}
+
+    # ==================== LOG CHANNEL SYSTEM ====================
+    def set_log_channel(self, guild_id: str, channel_id: int):
+        """Set log channel for server"""
+        self._set_setting(guild_id, "log_channel", channel_id)
+        self._invalidate_policy(guild_id)
+
+    def get_log_channel(self, guild_id: str) -> Optional[int]:
+        """Get log channel ID for server"""
+        return self._get_setting(guild_id, "log_channel", None)
+
+    def remove_log_channel(self, guild_id: str):
+        """Remove log channel for server"""
+        self._delete_setting(guild_id, "log_channel")
+        self._invalidate_policy(guild_id)
+
+# ==================== JSON MIGRATION ====================
+def import_json_data(conn: sqlite3.Connection, json_path: str) -> Dict[str, int]:
+    """Import a dorothy_data.json document into an open SQLite database"""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    security = data.get("security", {})
+    counts = {}
+
+    with conn:
+        warning_rows = [
+            (guild_id, user_id, entry.get("timestamp", ""), entry.get("count", index + 1), entry.get("reason", ""))
+            for guild_id, users in data.get("warnings", {}).items()
+            for user_id, entries in users.items()
+            for index, entry in enumerate(entries)
+        ]
+        conn.executemany(
+            "INSERT INTO warnings (guild_id, user_id, timestamp, count, reason) VALUES (?, ?, ?, ?, ?)", warning_rows
+        )
+        counts["warnings"] = len(warning_rows)
+
+        log_rows = [
+            (guild_id, entry.get("type", ""), entry.get("timestamp", ""),
+             json.dumps(entry.get("details", {}), ensure_ascii=False))
+            for guild_id, entries in security.get("security_logs", {}).items()
+            for entry in entries[-SECURITY_LOG_LIMIT:]
+        ]
+        conn.executemany(
+            "INSERT INTO security_logs (guild_id, type, timestamp, details) VALUES (?, ?, ?, ?)", log_rows
+        )
+        counts["security_logs"] = len(log_rows)
+
+        setting_rows = []
+        for section, key in (("prefixes", "prefix"), ("languages", "language"), ("log_channels", "log_channel")):
+            for guild_id, value in data.get(section, {}).items():
+                setting_rows.append((guild_id, key, json.dumps(value)))
+        for guild_id, domains in security.get("blocked_link_domains", {}).items():
+            setting_rows.append((guild_id, "blocked_link_domains", json.dumps(domains)))
+        for setting in ("anti_raid_enabled", "anti_spam_enabled", "anti_nuke_enabled", "auto_mod_enabled"):
+            for guild_id, value in security.get(setting, {}).items():
+                # Older files may hold an empty dict placeholder instead of a bool
+                if isinstance(value, bool):
+                    setting_rows.append((guild_id, setting, json.dumps(value)))
+        conn.executemany("INSERT OR REPLACE INTO settings (guild_id, key, value) VALUES (?, ?, ?)", setting_rows)
+        counts["settings"] = len(setting_rows)
+
+        for section, table, column in (
+            ("whitelisted_users", "whitelisted_users", "user_id"),
+            ("whitelisted_channels", "whitelisted_channels", "channel_id"),
+            ("blacklisted_words", "blacklisted_words", "word")
+        ):
+            rows = [(guild_id, str(value)) for guild_id, values in security.get(section, {}).items() for value in values]
+            conn.executemany(f"INSERT OR IGNORE INTO {table} (guild_id, {column}) VALUES (?, ?)", rows)
+            counts[table] = len(rows)
+
+        dm_rows = [
+            (user_id, info.get("timestamp", ""), info.get("reason", ""))
+            for user_id, info in data.get("dm_blocked_users", {}).items()
+        ]
+        conn.executemany(
+            "INSERT OR REPLACE INTO dm_blocked_users (user_id, timestamp, reason) VALUES (?, ?, ?)", dm_rows
+        )
+        counts["dm_blocked_users"] = len(dm_rows)
+
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)", (datetime.now().isoformat(),)
+        )
+
+    return counts
+
+def migrate_json_to_sqlite(json_path: str = "dorothy_data.json", db_path: str = "dorothy_data.db") -> Dict[str, int]:
+    """One-shot migration from the JSON data file to a SQLite database"""
+    manager = SQLiteDataManager(db_path, migrate_from=None)
+    try:
+        if manager._get_meta("json_migrated"):
+            return {}
+        return import_json_data(manager.conn, json_path)
+    finally:
+        manager.conn.close()
+
+if __name__ == "__main__":
+    # Usage: python sqlite_database.py [dorothy_data.json] [dorothy_data.db]
+    json_path = sys.argv[1] if len(sys.argv) > 1 else "dorothy_data.json"
+    db_path = sys.argv[2] if len(sys.argv) > 2 else "dorothy_data.db"
+    counts = migrate_json_to_sqlite(json_path, db_path)
+    if not counts:
+        print(f"{db_path} has already been migrated")
+    for table, count in counts.items():
+        print(f"{table}: {count} rows")
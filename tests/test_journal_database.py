@@ -0,0 +1,155 @@
+"""
+Crash recovery and compaction tests for the journal backend
+"""
+
+import asyncio
+import json
+import time
+from journal_database import JournalDataManager, read_journal
+
+def make_manager(tmp_path, compact_ops=1000) -> JournalDataManager:
+    return JournalDataManager(str(tmp_path / "data.json"), compact_ops=compact_ops)
+
+def crash(manager: JournalDataManager):
+    """Drop the manager without compacting, like a killed process"""
+    manager._journal.close()
+
+def write_records(path, *lines: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("".join(lines))
+
+def record(seq: int, guild_id: str, prefix: str) -> str:
+    return json.dumps({"seq": seq, "name": "set_prefix", "op": "set", "path": ["prefixes", guild_id], "value": prefix}) + "\n"
+
+# ==================== TORN AND CORRUPT RECORDS ====================
+def test_read_journal_stops_at_record_truncated_mid_write(tmp_path):
+    path = tmp_path / "data.journal"
+    torn = record(3, "1", "?")[:25]
+    write_records(path, record(1, "1", "!"), record(2, "2", "$"), torn)
+
+    ops = read_journal(str(path))
+
+    assert [op["seq"] for op in ops] == [1, 2]
+
+def test_read_journal_stops_at_corrupt_line(tmp_path):
+    path = tmp_path / "data.journal"
+    write_records(path, record(1, "1", "!"), "{not json\n", record(3, "1", "?"))
+
+    ops = read_journal(str(path))
+
+    assert [op["seq"] for op in ops] == [1]
+
+def test_manager_recovers_from_journal_truncated_mid_record(tmp_path):
+    manager = make_manager(tmp_path)
+    manager.set_prefix("1", "!")
+    manager.set_prefix("2", "$")
+    crash(manager)
+
+    # Cut the last record in half
+    journal = tmp_path / "data.journal"
+    content = journal.read_text(encoding='utf-8')
+    journal.write_text(content[:-10], encoding='utf-8')
+
+    recovered = make_manager(tmp_path)
+    assert recovered.get_prefix("1") == "!"
+    assert recovered.get_prefix("2") != "$"
+
+    # The torn tail is dropped, so new records are readable after a restart
+    recovered.set_prefix("3", "%")
+    crash(recovered)
+    reopened = make_manager(tmp_path)
+    assert reopened.get_prefix("1") == "!"
+    assert reopened.get_prefix("3") == "%"
+    crash(reopened)
+
+def test_manager_ignores_records_after_corrupt_line(tmp_path):
+    manager = make_manager(tmp_path)
+    manager.set_prefix("1", "!")
+    crash(manager)
+
+    with open(tmp_path / "data.journal", 'a', encoding='utf-8') as f:
+        f.write("\x00\x00garbage\n")
+        f.write(record(99, "1", "?"))
+
+    recovered = make_manager(tmp_path)
+    assert recovered.get_prefix("1") == "!"
+    crash(recovered)
+
+# ==================== SNAPSHOT + REPLAY ====================
+def test_snapshot_plus_journal_tail_replay(tmp_path):
+    manager = make_manager(tmp_path)
+    manager.set_prefix("1", "!")
+    manager.add_warning("1", "42", "first")
+    manager.flush()  # Snapshot
+    manager.set_prefix("1", "?")
+    manager.add_warning("1", "42", "second")
+    crash(manager)
+
+    snapshot = json.loads((tmp_path / "data.json").read_text(encoding='utf-8'))
+    assert snapshot["prefixes"]["1"] == "!"
+    assert len(read_journal(str(tmp_path / "data.journal"))) == 2
+
+    recovered = make_manager(tmp_path)
+    assert recovered.get_prefix("1") == "?"
+    assert recovered.get_warnings("1", "42") == 2
+    crash(recovered)
+
+def test_records_already_in_snapshot_are_not_replayed_twice(tmp_path):
+    manager = make_manager(tmp_path)
+    manager.add_warning("1", "42", "first")
+    manager.add_warning("1", "42", "second")
+    stale_journal = (tmp_path / "data.journal").read_text(encoding='utf-8')
+    manager.flush()
+    crash(manager)
+
+    # Crash between writing the snapshot and truncating the journal
+    (tmp_path / "data.journal").write_text(stale_journal, encoding='utf-8')
+
+    recovered = make_manager(tmp_path)
+    assert recovered.get_warnings("1", "42") == 2
+    crash(recovered)
+
+# ==================== COMPACTION ====================
+def test_compaction_keeps_records_appended_while_snapshot_is_written(tmp_path):
+    manager = make_manager(tmp_path, compact_ops=10000)
+    for guild in range(5):
+        manager.set_prefix(str(guild), "!")
+
+    # Slow snapshot writes so appends land while compaction is in progress
+    write_file = manager._write_file
+    def slow_write(payload):
+        time.sleep(0.05)
+        write_file(payload)
+    manager._write_file = slow_write
+
+    async def append_during_compaction():
+        for guild in range(5, 15):
+            manager.set_prefix(str(guild), "?")
+            await asyncio.sleep(0.002)
+
+    async def run():
+        await asyncio.gather(manager.compact_async(), append_during_compaction())
+    asyncio.run(run())
+
+    # Only the appends the snapshot missed remain in the journal
+    snapshot = json.loads((tmp_path / "data.json").read_text(encoding='utf-8'))
+    tail = read_journal(str(tmp_path / "data.journal"))
+    assert tail and all(op["seq"] > snapshot["_journal_seq"] for op in tail)
+    assert len(snapshot["prefixes"]) + len(tail) >= 15
+
+    crash(manager)
+    recovered = make_manager(tmp_path)
+    assert all(recovered.get_prefix(str(guild)) == "!" for guild in range(5))
+    assert all(recovered.get_prefix(str(guild)) == "?" for guild in range(5, 15))
+    crash(recovered)
+
+def test_threshold_compaction_folds_journal_into_snapshot(tmp_path):
+    manager = make_manager(tmp_path, compact_ops=5)
+    for guild in range(12):
+        manager.set_prefix(str(guild), "!")
+
+    assert len(read_journal(str(tmp_path / "data.journal"))) < 5
+    crash(manager)
+    recovered = make_manager(tmp_path)
+    assert all(recovered.get_prefix(str(guild)) == "!" for guild in range(12))
+    crash(recovered)
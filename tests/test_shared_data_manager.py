@@ -0,0 +1,84 @@
+"""
+Disk read tests for the shared data manager registry
+"""
+
+import asyncio
+import builtins
+import os
+from types import SimpleNamespace
+import database
+from database import DataManager, get_data_manager, set_data_manager
+from localization import get_text
+from outbound import outbound
+from security import SecurityManager
+from utils import log_security_event
+
+def count_reads(monkeypatch, path) -> list:
+    """Record every open() of path for reading from now on"""
+    reads = []
+    real_open = builtins.open
+
+    def tracking_open(file, mode='r', *args, **kwargs):
+        if os.path.abspath(str(file)) == os.path.abspath(str(path)) and 'r' in mode:
+            reads.append(mode)
+        return real_open(file, mode, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "open", tracking_open)
+    return reads
+
+def start_manager(tmp_path, monkeypatch) -> DataManager:
+    """Startup: load the data file once and register the manager"""
+    monkeypatch.setattr(database, "_shared_data_manager", None)
+    manager = DataManager(str(tmp_path / "dorothy_data.json"))
+    manager.set_prefix("1", "?")
+    manager.save_data()
+    set_data_manager(DataManager(manager.filename))
+    return get_data_manager()
+
+async def noop(*args, **kwargs):
+    pass
+
+def make_spam_message() -> SimpleNamespace:
+    guild = SimpleNamespace(
+        id=1, name="guild", text_channels=[], members=[],
+        get_channel=lambda channel_id: None, get_role=lambda role_id: None
+    )
+    author = SimpleNamespace(id=42, bot=False, mention="<@42>", timeout=noop, send=noop)
+    return SimpleNamespace(
+        guild=guild, author=author, channel=SimpleNamespace(id=7),
+        content="spam", mentions=[], delete=noop
+    )
+
+def test_registry_returns_the_loaded_manager(tmp_path, monkeypatch):
+    manager = start_manager(tmp_path, monkeypatch)
+    reads = count_reads(monkeypatch, manager.filename)
+
+    for _ in range(10):
+        assert get_data_manager() is manager
+        get_text("1", "dm_title")
+    assert reads == []
+
+    # What every get_text call used to do
+    DataManager(manager.filename)
+    assert len(reads) == 1
+
+def test_handle_spam_reads_data_file_zero_times(tmp_path, monkeypatch):
+    manager = start_manager(tmp_path, monkeypatch)
+    security_manager = SecurityManager(None, manager)
+    message = make_spam_message()
+    reads = count_reads(monkeypatch, manager.filename)
+
+    async def scenario():
+        spam_info = {"type": "message_spam", "reason": "Sent 10 messages in 10 seconds", "severity": "medium"}
+        try:
+            await security_manager.handle_spam(message, spam_info)
+            await log_security_event(message.guild, "🚨 Spam Detected", spam_info["reason"])
+        finally:
+            await security_manager.alerts.close()
+            await outbound.close()
+
+    asyncio.run(scenario())
+
+    assert reads == []
+    assert manager.get_prefix("1") == "?"
+    assert manager.data["security"]["security_logs"]["1"][-1]["type"] == "spam_detected"
@@ -0,0 +1,159 @@
+"""
+Dorothy Bot - Tracking Module
+In-memory sliding-window rate tracking for spam, raid, nuke and command detection
+"""
+
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Hashable, List, Optional
+
+class RateWindow:
+    """Ring buffer of (monotonic timestamp, payload) events for one key"""
+    __slots__ = ("times", "payloads")
+
+    def __init__(self, maxlen: int):
+        self.times = deque(maxlen=maxlen)
+        self.payloads = deque(maxlen=maxlen)
+
+    def add(self, now: float, payload: Any = None):
+        self.times.append(now)
+        self.payloads.append(payload)
+
+    def count_since(self, cutoff: float) -> int:
+        """Count events at or after cutoff (newest first, stops at the first older one)"""
+        count = 0
+        for timestamp in reversed(self.times):
+            if timestamp < cutoff:
+                break
+            count += 1
+        return count
+
+    @property
+    def last_seen(self) -> float:
+        return self.times[-1]
+
+class RateTracker:
+    """Per-key sliding-window event counter using monotonic timestamps
+
+    Keys are kept in least-recently-active order, so keys idle for longer
+    than idle_ttl are evicted from the front in O(1) amortized time.
+    """
+
+    def __init__(self, window: float, maxlen: int, idle_ttl: Optional[float] = None,
+                 store: Optional["TrackerStore"] = None):
+        self.window = window
+        self.maxlen = maxlen
+        # Never forget a key while it still has events inside the window
+        self.idle_ttl = max(window, idle_ttl) if idle_ttl is not None else None
+        self.store = store
+        self.evictions = {"idle": 0, "lru": 0}
+        self._windows: "OrderedDict[Hashable, RateWindow]" = OrderedDict()
+
+    def hit(self, key: Hashable, payload: Any = None, now: Optional[float] = None) -> int:
+        """Record an event for key and return how many events fall inside the window"""
+        if now is None:
+            now = time.monotonic()
+        self.evict_idle(now)
+
+        window = self._windows.get(key)
+        if window is None:
+            window = self._windows[key] = RateWindow(self.maxlen)
+            window.add(now, payload)
+            if self.store is not None:
+                self.store.enforce_budget()
+        else:
+            self._windows.move_to_end(key)
+            window.add(now, payload)
+        return window.count_since(now - self.window)
+
+    def count(self, key: Hashable, now: Optional[float] = None) -> int:
+        """Count events for key inside the window without recording one"""
+        window = self._windows.get(key)
+        if window is None:
+            return 0
+        if now is None:
+            now = time.monotonic()
+        return window.count_since(now - self.window)
+
+    def recent(self, key: Hashable) -> List[Any]:
+        """Get payloads of the last tracked events for key (oldest first)"""
+        window = self._windows.get(key)
+        return list(window.payloads) if window is not None else []
+
+    def clear(self, key: Hashable):
+        """Forget all events for key"""
+        self._windows.pop(key, None)
+
+    def evict_idle(self, now: Optional[float] = None):
+        """Drop keys with no events for longer than idle_ttl"""
+        if self.idle_ttl is None:
+            return
+        if now is None:
+            now = time.monotonic()
+        cutoff = now - self.idle_ttl
+        while self._windows:
+            window = next(iter(self._windows.values()))
+            if window.last_seen >= cutoff:
+                break
+            self._windows.popitem(last=False)
+            self.evictions["idle"] += 1
+
+    def oldest_seen(self) -> Optional[float]:
+        """Last activity time of the least recently active key"""
+        if not self._windows:
+            return None
+        return next(iter(self._windows.values())).last_seen
+
+    def evict_lru(self):
+        """Drop the least recently active key"""
+        if self._windows:
+            self._windows.popitem(last=False)
+            self.evictions["lru"] += 1
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+class TrackerStore:
+    """Group of rate trackers sharing one budget of live keys"""
+
+    def __init__(self, max_keys: int, idle_ttl: Optional[float] = None):
+        self.max_keys = max_keys
+        self.idle_ttl = idle_ttl
+        self.trackers: Dict[str, RateTracker] = {}
+
+    def tracker(self, name: str, window: float, maxlen: int) -> RateTracker:
+        """Create a tracker registered with this store"""
+        tracker = RateTracker(window, maxlen, idle_ttl=self.idle_ttl, store=self)
+        self.trackers[name] = tracker
+        return tracker
+
+    @property
+    def live_keys(self) -> int:
+        return sum(len(tracker) for tracker in self.trackers.values())
+
+    def enforce_budget(self):
+        """Evict the globally least recently active keys until under budget"""
+        while self.live_keys > self.max_keys:
+            candidates = [tracker for tracker in self.trackers.values() if len(tracker)]
+            if not candidates:
+                return
+            min(candidates, key=lambda tracker: tracker.oldest_seen()).evict_lru()
+
+    def evict_idle(self):
+        """Sweep idle keys from every tracker"""
+        now = time.monotonic()
+        for tracker in self.trackers.values():
+            tracker.evict_idle(now)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get live key and eviction counters"""
+        return {
+            "live_keys": self.live_keys,
+            "max_keys": self.max_keys,
+            "evictions_idle": sum(tracker.evictions["idle"] for tracker in self.trackers.values()),
+            "evictions_lru": sum(tracker.evictions["lru"] for tracker in self.trackers.values()),
+            "trackers": {
+                name: {"live_keys": len(tracker), **tracker.evictions}
+                for name, tracker in self.trackers.items()
+            }
+        }
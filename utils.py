@@ -6,7 +6,7 @@ Helper functions used throughout the bot
 import discord
 import re
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Iterable, Optional
 from discord.ext import commands
 from config import OWNER_IDS
 
@@ -57,6 +57,19 @@ def format_duration(minutes: int) -> str:
             return f"{days} ngày {hours} giờ"
         return f"{days} ngày"
 
+def latency_percentiles(samples: Iterable[float]) -> Dict[str, float]:
+    """p50/p95/p99/max of latency samples in seconds, as milliseconds (nearest rank)"""
+    samples = sorted(samples)
+    if not samples:
+        return {}
+    last = len(samples) - 1
+    result = {
+        f"p{pct}": round(samples[min(last, int(len(samples) * pct / 100))] * 1000, 1)
+        for pct in (50, 95, 99)
+    }
+    result["max"] = round(samples[-1] * 1000, 1)
+    return result
+
 def has_mod_permissions():
     """Check if user has moderation permissions"""
     def predicate(ctx):
@@ -77,6 +90,7 @@ def has_admin_permissions():
 async def send_dm_notification(member: discord.Member, action: str, reason: str, server_name: str, extra_info: str = None, guild_id: str = None) -> bool:
     """Send DM notification to user about moderation action"""
     from localization import get_text
+    from outbound import outbound, LOGGING
     
     try:
         # Get guild language
@@ -98,7 +112,7 @@ async def send_dm_notification(member: discord.Member, action: str, reason: str,
         
         embed.set_footer(text=get_text(guild_id, "dm_footer"))
         
-        await member.send(embed=embed)
+        await outbound.run(LOGGING, f"dm:{member.id}", lambda: member.send(embed=embed))
         return True
     except discord.Forbidden:
         return False
@@ -107,20 +121,14 @@ async def send_dm_notification(member: discord.Member, action: str, reason: str,
 
 async def log_moderation_action(guild: discord.Guild, action: str, target: discord.Member, moderator: discord.Member, reason: str = None):
     """Log moderation actions to a log channel if exists"""
-    from database import DataManager
     from localization import get_text
+    from log_resolver import log_channels
+    from log_sink import log_sink
     
-    data_manager = DataManager()
     guild_id = str(guild.id)
-    log_channel_id = data_manager.get_log_channel(guild_id)
-    
-    # Try custom log channel first, fallback to mod-log
-    log_channel = None
-    if log_channel_id:
-        log_channel = guild.get_channel(log_channel_id)
     
-    if not log_channel:
-        log_channel = discord.utils.get(guild.text_channels, name="mod-log")
+    # Custom log channel first, fallback to mod-log
+    log_channel = log_channels.resolve(guild, "mod-log")
     
     if log_channel:
         try:
@@ -134,25 +142,17 @@ async def log_moderation_action(guild: discord.Guild, action: str, target: disco
             embed.add_field(name="👤 Target", value=target.mention, inline=True)
             embed.add_field(name=get_text(guild_id, "warning_reason"), value=reason or no_reason, inline=False)
             embed.set_footer(text=f"ID: {target.id}")
-            await log_channel.send(embed=embed)
+            log_sink.post(log_channel, embed)
         except:
             pass
 
 async def log_security_event(guild: discord.Guild, event_title: str, description: str, color: discord.Color = discord.Color.orange()):
     """Log security events to log channel (same as moderation)"""
-    from database import DataManager
-    
-    data_manager = DataManager()
-    guild_id = str(guild.id)
-    log_channel_id = data_manager.get_log_channel(guild_id)
-    
-    # Try custom log channel first, fallback to security-log
-    log_channel = None
-    if log_channel_id:
-        log_channel = guild.get_channel(log_channel_id)
+    from log_resolver import log_channels
+    from log_sink import log_sink
     
-    if not log_channel:
-        log_channel = discord.utils.get(guild.text_channels, name="security-log")
+    # Custom log channel first, fallback to security-log
+    log_channel = log_channels.resolve(guild, "security-log")
     
     if log_channel:
         try:
@@ -163,6 +163,6 @@ async def log_security_event(guild: discord.Guild, event_title: str, description
                 timestamp=datetime.now()
             )
             embed.set_footer(text="Dorothy Security System")
-            await log_channel.send(embed=embed)
+            log_sink.post(log_channel, embed)
         except:
             pass